@@ -39,6 +39,7 @@ from .operators import *
 from .ui import *
 from .lib import classes_to_register
 from . import addon_updater_ops
+from .subtrees.addon_common.common.decorators import PersistentOptions
 
 def register():
     # register classes
@@ -50,6 +51,9 @@ def register():
     addon_updater_ops.register(bl_info)
 
 def unregister():
+    # write any pending options changes
+    PersistentOptions.flush_all()
+
     # addon updater unregister
     addon_updater_ops.unregister()
 
@@ -20,19 +20,20 @@
 
 # Blender imports
 import bpy
-import blf
 import bgl
 from mathutils import Vector
 from bpy_extras import view3d_utils
 
 # Module imports
 from ...subtrees.addon_common.cookiecutter.cookiecutter import CookieCutter
+from ...subtrees.addon_common.common.counters import counters
 
 
 #borrowed from edge filet from Zeffi (included with blend)
 def draw_3d_points(context, points, size, color = (1,0,0,1)):
     region = context.region
     rv3d = context.space_data.region_3d
+    counters.incr('picker draw_3d_points')
 
 
     bgl.glEnable(bgl.GL_POINT_SMOOTH)
@@ -71,6 +72,8 @@ class PointsPicker_UI_Draw():
 
     @CookieCutter.Draw("post3d")
     def draw_postview(self):
+        counters.incr('picker draw postview')
+        counters.gauge('picker points', len(self.b_pts))
         if len(self.b_pts) == 0: return
         draw_3d_points(bpy.context, [pt.location for pt in self.b_pts], 3)
 
@@ -94,10 +97,9 @@ class PointsPicker_UI_Draw():
         #     pt = self.b_pts[self.hovered[1]]
         #     draw_3d_points(bpy.context, [pt.location], 8, color=(0,1,0,1))
 
+        counters.incr('picker draw postpixel')
         region = bpy.context.region
         rv3d = bpy.context.space_data.region_3d
-        dpi = bpy.context.user_preferences.system.dpi
-        # blf.size(0, 20, dpi) #fond_id = 0
         for i,pt in enumerate(self.b_pts):
             if pt.label:
                 if self.selected == i:
@@ -106,7 +108,8 @@ class PointsPicker_UI_Draw():
                     color = (0,1,0,1)
                 else:
                     color = (1,0,0,1)
-                bgl.glColor4f(*color)
                 vector2d = view3d_utils.location_3d_to_region_2d(region, rv3d, pt.location)
-                blf.position(0, vector2d[0], vector2d[1] + 5, 0)
-                blf.draw(0, pt.label) #font_id = 0
+                if vector2d is None: continue
+                self.label_batch.add(pt.label, (vector2d[0], vector2d[1] + 5), color)
+        # all labels are drawn together with one draw call
+        self.label_batch.draw()
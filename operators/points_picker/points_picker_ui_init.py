@@ -23,6 +23,7 @@
 
 # Module imports
 from ...subtrees.addon_common.common import ui
+from ...subtrees.addon_common.common.text_render import TextBatchRender
 
 
 class PointsPicker_UI_Init():
@@ -42,7 +43,7 @@ class PointsPicker_UI_Init():
         }
 
         # Help Window
-        self.info_panel = self.wm.create_window('Points Picker Help', {'pos':9, 'movable':True})#, 'bgcolor':(0.30, 0.60, 0.30, 0.90)})
+        self.info_panel = self.wm.create_window('Points Picker Help', {'pos':9, 'movable':True, 'cached':True})#, 'bgcolor':(0.30, 0.60, 0.30, 0.90)})
         self.info_panel.add(ui.UI_Label('Instructions', align=0, margin=4))
         self.inst_paragraphs = [self.info_panel.add(ui.UI_Markdown('', min_size=(200,10))) for i in range(3)]
         #for i in self.inst_paragraphs: i.visible = False
@@ -54,6 +55,9 @@ class PointsPicker_UI_Init():
         segmentation_container.add(ui.UI_Button('Commit', self.done, align=0))
         segmentation_container.add(ui.UI_Button('Cancel', lambda:self.done(cancel=True), align=0))
 
+        # point labels are drawn together with one draw call (see draw_postpixel)
+        self.label_batch = TextBatchRender(fontid=0)
+
     def set_ui_text(self):
         """ sets the viewport text """
         self.reset_ui_text()
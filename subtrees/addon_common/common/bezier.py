@@ -21,10 +21,10 @@ Created by Jonathan Denning, Jonathan Williamson
 
 import math
 
-from mathutils import Vector, Matrix
+import numpy as np
+from mathutils import Vector
 
-from .maths import Point, Vec
-from .utils import iter_running_sum
+from .maths import Point, Point2D, Vec
 
 
 def compute_quadratic_weights(t):
@@ -42,84 +42,93 @@ def interpolate_cubic(v0, v1, v2, v3, t):
     return v0*b0 + v1*b1 + v2*b2 + v3*b3
 
 
-def compute_cubic_error(v0, v1, v2, v3, l_v, l_t):
-    return math.sqrt(sum(
-        (interpolate_cubic(v0, v1, v2, v3, t) - v)**2
-        for v, t in zip(l_v, l_t)
-    ))
+def compute_cubic_weights_many(ts):
+    '''
+    returns Nx4 array of cubic bernstein weights, one row per t in ts
+    '''
+    t0 = np.asarray(ts, dtype=np.float64)
+    t1 = 1 - t0
+    return np.stack([t1**3, 3*t0*t1**2, 3*t0**2*t1, t0**3], axis=-1)
 
 
-def fit_cubicbezier(l_v, l_t):
-    #########################################################
-    # http://nbviewer.ipython.org/gist/anonymous/5688579
-
-    # make the summation functions for A (16 of them)
-    A_fns = [
-        lambda l_t: sum([2*t**0*(t-1)**6 for t in l_t]),
-        lambda l_t: sum([-6*t**1*(t-1)**5 for t in l_t]),
-        lambda l_t: sum([6*t**2*(t-1)**4 for t in l_t]),
-        lambda l_t: sum([-2*t**3*(t-1)**3 for t in l_t]),
-
-        lambda l_t: sum([-6*t**1*(t-1)**5 for t in l_t]),
-        lambda l_t: sum([18*t**2*(t-1)**4 for t in l_t]),
-        lambda l_t: sum([-18*t**3*(t-1)**3 for t in l_t]),
-        lambda l_t: sum([6*t**4*(t-1)**2 for t in l_t]),
-
-        lambda l_t: sum([6*t**2*(t-1)**4 for t in l_t]),
-        lambda l_t: sum([-18*t**3*(t-1)**3 for t in l_t]),
-        lambda l_t: sum([18*t**4*(t-1)**2 for t in l_t]),
-        lambda l_t: sum([-6*t**5*(t-1)**1 for t in l_t]),
-
-        lambda l_t: sum([-2*t**3*(t-1)**3 for t in l_t]),
-        lambda l_t: sum([6*t**4*(t-1)**2 for t in l_t]),
-        lambda l_t: sum([-6*t**5*(t-1)**1 for t in l_t]),
-        lambda l_t: sum([2*t**6*(t-1)**0 for t in l_t])
-    ]
-
-    # make the summation functions for b (4 of them)
-    b_fns = [
-        lambda l_t, l_v: sum(v * (-2 * (t**0) * ((t-1)**3))
-                             for t, v in zip(l_t, l_v)),
-        lambda l_t, l_v: sum(v * (6 * (t**1) * ((t-1)**2))
-                             for t, v in zip(l_t, l_v)),
-        lambda l_t, l_v: sum(v * (-6 * (t**2) * ((t-1)**1))
-                             for t, v in zip(l_t, l_v)),
-        lambda l_t, l_v: sum(v * (2 * (t**3) * ((t-1)**0))
-                             for t, v in zip(l_t, l_v)),
-    ]
-
-    # compute the data we will put into matrix A
-    A_values = [fn(l_t) for fn in A_fns]
-    # fill the A matrix with data
-    A_matrix = Matrix(tuple(zip(*[iter(A_values)]*4)))
-    try:
-        A_inv = A_matrix.inverted()
-    except:
-        return (float('inf'), l_v[0], l_v[0], l_v[0], l_v[0])
+def compute_quadratic_weights_many(ts):
+    '''
+    returns Nx3 array of quadratic bernstein weights, one row per t in ts
+    '''
+    t0 = np.asarray(ts, dtype=np.float64)
+    t1 = 1 - t0
+    return np.stack([t1**2, 2*t0*t1, t0**2], axis=-1)
+
+
+def points_from_array(co):
+    '''
+    returns rows of NxD array co as Point2D (D=2) or Point (D=3)
+    '''
+    cls = Point2D if co.shape[-1] == 2 else Point
+    return [cls(tuple(p)) for p in co]
 
-    # compute the data we will put into the b vector
-    b_values = [fn(l_t, l_v) for fn in b_fns]
-    # fill the b vector with data
-    b_vector = Vector(b_values)
 
-    # solve for the unknowns in vector x
-    v0, v1, v2, v3 = A_inv * b_vector
+def compute_chord_ts(l_co):
+    '''
+    returns points as NxD array, chord length parameterization of points (0 to 1), and total length
+    '''
+    co = np.array([tuple(v) for v in l_co], dtype=np.float64)
+    l_d = np.sqrt(np.sum(np.diff(co, axis=0)**2, axis=1))
+    l_ad = np.concatenate([[0.0], np.cumsum(l_d)])
+    dist = l_ad[-1]
+    return (co, l_ad / dist if dist > 0 else l_ad, dist)
 
-    err = compute_cubic_error(v0, v1, v2, v3, l_v, l_t) / len(l_v)
 
+def compute_cubic_error(v0, v1, v2, v3, l_v, l_t):
+    vs = np.array([v0, v1, v2, v3], dtype=np.float64)
+    diff = compute_cubic_weights_many(l_t).dot(vs) - np.asarray(l_v, dtype=np.float64)
+    return math.sqrt(np.sum(diff**2))
+
+
+def fit_cubicbezier(l_v, l_t):
+    '''
+    least squares fit of 1D cubic bezier to values l_v at parameters l_t.
+    returns (error, v0, v1, v2, v3)
+    '''
+    l_v = np.asarray(l_v, dtype=np.float64)
+    B = compute_cubic_weights_many(l_t)
+    x, _, rank, _ = np.linalg.lstsq(B, l_v, rcond=-1)
+    if rank < 4:
+        return (float('inf'), l_v[0], l_v[0], l_v[0], l_v[0])
+    v0, v1, v2, v3 = x
+    err = math.sqrt(np.sum((B.dot(x) - l_v)**2)) / len(l_v)
     return (err, v0, v1, v2, v3)
 
 
+def fit_cubicbezier_points(co, l_t):
+    '''
+    least squares fit of cubic bezier to NxD array of points co at parameters l_t, solving all
+    axes at once.  returns (error, max_error, p0, p1, p2, p3), where error is sum of per axis
+    errors (as from fit_cubicbezier) and max_error is largest distance from a point to its fit
+    '''
+    B = compute_cubic_weights_many(l_t)
+    x, _, rank, _ = np.linalg.lstsq(B, co, rcond=-1)
+    if rank < 4:
+        p = points_from_array(co[:1])[0]
+        return (float('inf'), float('inf'), p, p, p, p)
+    diff = B.dot(x) - co
+    err = np.sum(np.sqrt(np.sum(diff**2, axis=0))) / len(co)
+    max_err = np.max(np.linalg.norm(diff, axis=1))
+    p0, p1, p2, p3 = points_from_array(x)
+    return (err, max_err, p0, p1, p2, p3)
+
+
 def fit_cubicbezier_spline(
     l_co, error_scale, depth=0,
-    t0=0, t3=-1, allow_split=True, force_split=False
+    t0=0, t3=-1, allow_split=True, force_split=False, max_error=None
 ):
     '''
     fits cubic bezier to given points
     returns list of tuples of (t0,t3,p0,p1,p2,p3)
     that best fits the given points l_co
     where t0 and t3 are the passed-in t0 and t3
-    and p0,p1,p2,p3 are the control points of bezier
+    and p0,p1,p2,p3 are the control points of bezier.
+    if max_error is given, a fit is also split when any point is farther than max_error from it
     '''
     count = len(l_co)
     if t3 == -1:
@@ -141,30 +150,23 @@ def fit_cubicbezier_spline(
             new_co, error_scale,
             depth=depth,
             t0=t0, t3=t3,
-            allow_split=allow_split, force_split=force_split
+            allow_split=allow_split, force_split=force_split, max_error=max_error
         )
-    l_d = [0] + [(v0-v1).length for v0, v1 in zip(l_co[:-1], l_co[1:])]
-    l_ad = [s for d, s in iter_running_sum(l_d)]
-    dist = sum(l_d)
+    co, l_t, dist = compute_chord_ts(l_co)
     if dist <= 0:
         # print(spc + 'fit_cubicbezier_spline: returning []')
         return []  # [(t0,t3,l_co[0],l_co[0],l_co[0],l_co[0])]
-    l_t = [ad/dist for ad in l_ad]
 
-    ex, x0, x1, x2, x3 = fit_cubicbezier([co[0] for co in l_co], l_t)
-    ey, y0, y1, y2, y3 = fit_cubicbezier([co[1] for co in l_co], l_t)
-    ez, z0, z1, z2, z3 = fit_cubicbezier([co[2] for co in l_co], l_t)
-    tot_error = ex+ey+ez
+    tot_error, max_err, p0, p1, p2, p3 = fit_cubicbezier_points(co, l_t)
     # print(spc + 'total error = %f (%f)' % (tot_error,error_scale)) #, l=4)
 
     if not force_split:
         do_not_split = tot_error < error_scale
+        if max_error is not None: do_not_split &= max_err <= max_error
         do_not_split |= depth == 4
         do_not_split |= len(l_co) <= 15
         do_not_split |= not allow_split
         if do_not_split:
-            p0, p1 = Point((x0, y0, z0)), Point((x1, y1, z1))
-            p2, p3 = Point((x2, y2, z2)), Point((x3, y3, z3))
             return [(t0, t3, p0, p1, p2, p3)]
 
     # too much error in fit.  split sequence in two, and fit each sub-sequence
@@ -192,8 +194,6 @@ def fit_cubicbezier_spline(
 
     if ind_split == -1:
         # did not find a good splitting point!
-        p0, p1, p2, p3 = Point((x0, y0, z0)), Point(
-            (x1, y1, z1)), Point((x2, y2, z2)), Point((x3, y3, z3))
         #p0,p3 = Point(l_co[0]),Point(l_co[-1])
         return [(t0, t3, p0, p1, p2, p3)]
 
@@ -202,15 +202,16 @@ def fit_cubicbezier_spline(
     l_co0, l_co1 = l_co[:ind_split+1], l_co[ind_split:]   # share split point
     tsplit = ind_split  # / (len(l_co)-1)
     bezier0 = fit_cubicbezier_spline(
-        l_co0, error_scale, depth=depth+1, t0=t0, t3=tsplit)
+        l_co0, error_scale, depth=depth+1, t0=t0, t3=tsplit, max_error=max_error)
     bezier1 = fit_cubicbezier_spline(
-        l_co1, error_scale, depth=depth+1, t0=tsplit, t3=t3)
+        l_co1, error_scale, depth=depth+1, t0=tsplit, t3=t3, max_error=max_error)
     return bezier0 + bezier1
 
 
 class CubicBezier:
     split_default = 100
     segments_default = 100
+    arclength_cache_max = 4     # arc length tables kept per bezier, one per (fn_dist, split)
 
     @staticmethod
     def create_from_points(pts_list):
@@ -232,27 +233,19 @@ class CubicBezier:
             d003, d303 = (p03-p0), (p03-p3)
             p1, p2 = p0+d003*0.5, p3+d303*0.5
             return CubicBezier(p0, p1, p2, p3)
-        l_d = [0] + [(p0-p1).length for p0,
-                     p1 in zip(pts_list[:-1], pts_list[1:])]
-        l_ad = [s for d, s in iter_running_sum(l_d)]
-        dist = sum(l_d)
+        co, l_t, dist = compute_chord_ts(pts_list)
         if dist <= 0:
             p0 = pts_list[0]
             return CubicBezier(p0, p0, p0, p0)
-        l_t = [ad/dist for ad in l_ad]
-
-        ex, x0, x1, x2, x3 = fit_cubicbezier([pt[0] for pt in pts_list], l_t)
-        ey, y0, y1, y2, y3 = fit_cubicbezier([pt[1] for pt in pts_list], l_t)
-        ez, z0, z1, z2, z3 = fit_cubicbezier([pt[2] for pt in pts_list], l_t)
-        p0 = Point((x0, y0, z0))
-        p1 = Point((x1, y1, z1))
-        p2 = Point((x2, y2, z2))
-        p3 = Point((x3, y3, z3))
+
+        _, _, p0, p1, p2, p3 = fit_cubicbezier_points(co, l_t)
         return CubicBezier(p0, p1, p2, p3)
 
     def __init__(self, p0, p1, p2, p3):
         self.p0, self.p1, self.p2, self.p3 = p0, p1, p2, p3
         self.tessellation = []
+        self._arclength_points = None
+        self._arclength = {}
 
     def __iter__(self): return iter([self.p0, self.p1, self.p2, self.p3])
 
@@ -275,6 +268,23 @@ class CubicBezier:
         b0, b1, b2 = compute_quadratic_weights(t)
         return q0*b0 + q1*b1 + q2*b2
 
+    def points_array(self):
+        ''' returns control points as 4xD array, where D is dimension of points '''
+        return np.array([tuple(p) for p in self.points()], dtype=np.float64)
+
+    def eval_many(self, ts):
+        '''
+        evaluates curve at all t in ts at once.  returns NxD array
+        '''
+        return compute_cubic_weights_many(ts).dot(self.points_array())
+
+    def eval_derivative_many(self, ts):
+        '''
+        evaluates derivative of curve at all t in ts at once.  returns NxD array
+        '''
+        q = 3 * np.diff(self.points_array(), axis=0)
+        return compute_quadratic_weights_many(ts).dot(q)
+
     def subdivide(self, iters=1):
         if iters == 0:
             return [self]
@@ -328,49 +338,67 @@ class CubicBezier:
         l = self.subdivide_linesegments(fn_dist, max_linearity=max_linearity)
         return sum(fn_dist(cb.p0, cb.p3) for cb in l)
 
-    def approximate_length_uniform(self, fn_dist, split=None):
-        split = split or self.split_default
-        p = self.p0
-        d = 0
-        for i in range(split):
-            q = self.eval((i+1) / split)
-            d += fn_dist(p, q)
-            p = q
-        return d
-
-    def approximate_t_at_interval_uniform(self, interval, fn_dist, split=None):
+    def get_arclength_table(self, fn_dist=None, split=None):
+        '''
+        returns arrays (ts, lengths), where lengths[i] is approximate arc length from t=0 to ts[i].
+        fn_dist of None measures euclidean distance.  tables are cached per (fn_dist, split) until
+        control points change, keeping only the most recent arclength_cache_max, so passing a new
+        lambda on every call still works (but misses the cache)
+        '''
         split = split or self.split_default
-        p = self.p0
-        d = 0
-        for i in range(split):
-            percent = (i+1) / split
-            q = self.eval(percent)
-            d += fn_dist(p, q)
-            if interval <= d:
-                return percent
-            p = q
-        return 1
+        points = tuple(tuple(p) for p in self.points())
+        if self._arclength_points != points:
+            self._arclength.clear()
+            self._arclength_points = points
+        key = (fn_dist, split)
+        table = self._arclength.pop(key, None)
+        if table is None:
+            table = self._compute_arclength_table(fn_dist, split)
+            while len(self._arclength) >= self.arclength_cache_max:
+                del self._arclength[next(iter(self._arclength))]
+        self._arclength[key] = table    # (re)insert as most recently used
+        return table
+
+    def _compute_arclength_table(self, fn_dist, split):
+        ts = np.arange(split + 1) / split
+        co = self.eval_many(ts)
+        if fn_dist is None:
+            ds = np.sqrt(np.sum(np.diff(co, axis=0)**2, axis=1))
+        else:
+            ps = points_from_array(co)
+            ds = [fn_dist(p, q) for p, q in zip(ps[:-1], ps[1:])]
+        return (ts, np.concatenate([[0.0], np.cumsum(ds)]))
+
+    def approximate_length_uniform(self, fn_dist=None, split=None):
+        _, lengths = self.get_arclength_table(fn_dist, split=split)
+        return float(lengths[-1])
+
+    def approximate_t_at_interval_uniform(self, interval, fn_dist=None, split=None):
+        return self.approximate_ts_at_intervals_uniform([interval], fn_dist, split=split)[0]
 
     def approximate_ts_at_intervals_uniform(
-        self, intervals, fn_dist, split=None
+        self, intervals, fn_dist=None, split=None
     ):
-        a = self.approximate_t_at_interval_uniform
-
-        def approx(i): return a(i, fn_dist, split=None)
-        return [approx(interval) for interval in intervals]
+        '''
+        returns list of t values, one for each arc length in intervals
+        '''
+        ts, lengths = self.get_arclength_table(fn_dist, split=split)
+        # first sample past t=0 that reaches interval (t=1 if interval is past end)
+        intervals = np.asarray(intervals, dtype=np.float64)
+        idx = np.searchsorted(lengths[1:], intervals, side='left') + 1
+        return ts[np.minimum(idx, len(ts) - 1)].tolist()
 
     def get_tessellate_uniform(self, fn_dist, split=None):
         split = split or self.split_default
         ts = [i/(split-1) for i in range(split)]
-        ps = [self.eval(t) for t in ts]
+        ps = points_from_array(self.eval_many(np.array(ts)))
         ds = [0] + [fn_dist(p, q) for p, q in zip(ps[:-1], ps[1:])]
         return [(t, p, d) for t, p, d in zip(ts, ps, ds)]
 
     def tessellate_uniform_points(self, segments=None):
         segments = segments or self.segments_default
-        ts = [i/(segments-1) for i in range(segments)]
-        ps = [self.eval(t) for t in ts]
-        return ps
+        ts = np.arange(segments) / (segments-1)
+        return points_from_array(self.eval_many(ts))
 
     #########################################
     #                                       #
@@ -425,6 +453,8 @@ class CubicBezierSpline:
         self.cbs = cbs
         self.inds = inds
         self.tessellation = []
+        self._tessellation_table = None
+        self._arclength = {}
 
     def copy(self):
         return CubicBezierSpline(
@@ -489,38 +519,86 @@ class CubicBezierSpline:
             t = t - idx
         return self.cbs[idx].eval_derivative(t)
 
-    def approximate_totlength_uniform(self, fn_dist, split=None):
+    def _segment_ts(self, ts):
+        '''
+        splits spline parameters into segment indices and segment t values (same clamping as eval)
+        '''
+        ts = np.asarray(ts, dtype=np.float64)
+        idx = np.clip(np.floor(ts), 0, len(self)-1).astype(np.int64)
+        t = np.where(ts < 0, 0.0, np.where(ts >= len(self), 1.0, ts - idx))
+        return (idx, t)
+
+    def points_array(self):
+        ''' returns control points of all segments as Sx4xD array '''
+        if not self.cbs: return np.zeros((0, 4, 3))
+        return np.array([cb.points_array() for cb in self.cbs])
+
+    def eval_many(self, ts):
+        '''
+        evaluates spline at all spline parameters in ts at once, evaluating all segments together.
+        returns NxD array
+        '''
+        idx, t = self._segment_ts(ts)
+        p = self.points_array()[idx]
+        return np.einsum('nk,nkd->nd', compute_cubic_weights_many(t), p)
+
+    def eval_derivative_many(self, ts):
+        '''
+        evaluates derivative of spline at all spline parameters in ts at once.  returns NxD array
+        '''
+        idx, t = self._segment_ts(ts)
+        q = 3 * np.diff(self.points_array(), axis=1)[idx]
+        return np.einsum('nk,nkd->nd', compute_quadratic_weights_many(t), q)
+
+    def approximate_totlength_uniform(self, fn_dist=None, split=None):
         return sum(self.approximate_lengths_uniform(fn_dist, split=split))
 
-    def approximate_lengths_uniform(self, fn_dist, split=None):
+    def approximate_lengths_uniform(self, fn_dist=None, split=None):
         return [
             cb.approximate_length_uniform(fn_dist, split=split)
             for cb in self.cbs
         ]
 
+    def get_arclength_table(self, fn_dist=None, split=None):
+        '''
+        returns arrays (ts, lengths) for whole spline, where ts are spline parameters (segment
+        index + t) and lengths[i] is approximate arc length from start of spline to ts[i].
+        built from the tables of the segments, and cached per (fn_dist, split) until one of them
+        changes (see CubicBezier.get_arclength_table)
+        '''
+        tables = [cb.get_arclength_table(fn_dist, split=split) for cb in self.cbs]
+        key = (fn_dist, split)
+        cached = self._arclength.pop(key, None)
+        if cached is None or len(cached[0]) != len(tables) or any(a is not b for a, b in zip(cached[0], tables)):
+            if tables:
+                offsets = np.cumsum([0.0] + [lengths[-1] for _, lengths in tables[:-1]])
+                table = (
+                    np.concatenate([i + ts[1:] for i, (ts, _) in enumerate(tables)]),
+                    np.concatenate([o + lengths[1:] for o, (_, lengths) in zip(offsets, tables)]),
+                )
+            else:
+                table = (np.zeros(0), np.zeros(0))
+            cached = (tables, table)
+            while len(self._arclength) >= CubicBezier.arclength_cache_max:
+                del self._arclength[next(iter(self._arclength))]
+        self._arclength[key] = cached   # (re)insert as most recently used
+        return cached[1]
+
     def approximate_ts_at_intervals_uniform(
-        self, intervals, fn_dist, split=None
+        self, intervals, fn_dist=None, split=None
     ):
-        lengths = self.approximate_lengths_uniform(fn_dist, split=split)
-        totlength = sum(lengths)
-        ts = []
-        for interval in intervals:
-            if interval < 0:
-                ts.append(0)
-                continue
-            if interval >= totlength:
-                ts.append(len(self.cbs))
-                continue
-            for i, length in enumerate(lengths):
-                if interval <= length:
-                    t = self.cbs[i].approximate_t_at_interval_uniform(
-                        interval, fn_dist, split=split)
-                    ts.append(i + t)
-                    break
-                interval -= length
-            else:
-                assert False
-        return ts
+        '''
+        returns list of spline parameters, one for each arc length in intervals
+        '''
+        ts, lengths = self.get_arclength_table(fn_dist, split=split)
+        return self._lookup_ts(ts, lengths, intervals)
+
+    def _lookup_ts(self, ts, lengths, intervals):
+        intervals = np.asarray(intervals, dtype=np.float64)
+        if len(ts) == 0: return [0.0] * len(intervals)
+        idx = np.minimum(np.searchsorted(lengths, intervals, side='left'), len(ts) - 1)
+        ts = np.where(intervals >= lengths[-1], float(len(self.cbs)), ts[idx])
+        return np.where(intervals < 0, 0.0, ts).tolist()
 
     def subdivide_linesegments(self, fn_dist, max_linearity=None):
         return CubicBezierSpline(cbi
@@ -540,10 +618,22 @@ class CubicBezierSpline:
 
     def tessellate_uniform(self, fn_dist, split=None):
         self.tessellation.clear()
+        self._tessellation_table = None
         for i, cb in enumerate(self.cbs):
             cb_tess = cb.get_tessellate_uniform(fn_dist, split=split)
             self.tessellation.append(cb_tess)
 
+    def get_tessellation_table(self):
+        '''
+        returns arrays (ts, lengths) of tessellation, where ts are spline parameters and
+        lengths[i] is arc length from start of spline to ts[i].  cached until next tessellate
+        '''
+        if self._tessellation_table is None:
+            ts = [i + t for i, cb_tess in enumerate(self.tessellation) for t, _, _ in cb_tess]
+            ds = [d for cb_tess in self.tessellation for _, _, d in cb_tess]
+            self._tessellation_table = (np.array(ts, dtype=np.float64), np.cumsum(np.array(ds, dtype=np.float64)))
+        return self._tessellation_table
+
     def approximate_totlength_tessellation(self):
         return sum(self.approximate_lengths_tessellation())
 
@@ -551,33 +641,11 @@ class CubicBezierSpline:
         return [sum(d for _, _, d in cb_tess) for cb_tess in self.tessellation]
 
     def approximate_ts_at_intervals_tessellation(self, intervals):
-        lengths = self.approximate_lengths_tessellation()
-        totlength = sum(lengths)
-        ts = []
-        for interval in intervals:
-            if interval < 0:
-                ts.append(0)
-                continue
-            if interval >= totlength:
-                ts.append(len(self.cbs))
-                continue
-            for i, length in enumerate(lengths):
-                if interval > length:
-                    interval -= length
-                    continue
-                cb_tess = self.tessellation[i]
-                for t, p, d in cb_tess:
-                    if interval > d:
-                        interval -= d
-                        continue
-                    ts.append(i+t)
-                    break
-                else:
-                    assert False
-                break
-            else:
-                assert False
-        return ts
+        '''
+        returns list of spline parameters, one for each arc length in intervals
+        '''
+        ts, lengths = self.get_tessellation_table()
+        return self._lookup_ts(ts, lengths, intervals)
 
     def approximate_ts_at_points_tessellation(self, points, fn_dist):
         ts = []
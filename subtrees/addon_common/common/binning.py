@@ -0,0 +1,97 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+'''
+array helpers for binning elements into a uniform grid (see maths.Accel2D).  these only need
+numpy, so they can be used (and tested) outside Blender
+'''
+
+import numpy as np
+
+
+def bins_from_cells(owners, cells, nbins):
+    '''
+    packs (owner, cell) pairs into CSR-style bins
+    returns (offsets, items), where the owners in cell c are items[offsets[c]:offsets[c+1]]
+    '''
+    order = np.argsort(cells, kind='mergesort')
+    counts = np.bincount(cells, minlength=nbins)
+    offsets = np.zeros(nbins + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return (offsets, owners[order])
+
+
+def cells_in_rects(i0, j0, i1, j1, cols):
+    '''
+    expands inclusive cell rectangles [i0,i1]x[j0,j1] (one per owner) into (owner, cell) pairs
+    '''
+    w = i1 - i0 + 1
+    counts = w * (j1 - j0 + 1)
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    w = w[owners]
+    ci = i0[owners] + local % w
+    cj = j0[owners] + local // w
+    return (owners, cj * cols + ci)
+
+
+def segment_column_runs(x0, y0, x1, y1, cols, rows):
+    '''
+    walks segments (in grid units) column by column, like a DDA that steps along x
+    returns (owners, i, j0, j1): segment owners[k] crosses rows j0[k]..j1[k] of column i[k]
+    '''
+    xa, xb = np.minimum(x0, x1), np.maximum(x0, x1)
+    ia = np.clip(np.floor(xa), 0, cols - 1).astype(np.int64)
+    ib = np.clip(np.floor(xb), 0, cols - 1).astype(np.int64)
+    counts = ib - ia + 1
+    owners = np.repeat(np.arange(len(counts)), counts)
+    i = ia[owners] + (np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts))
+    # clip each segment to the x-extent of the column it crosses
+    lo = np.maximum(xa[owners], np.where(i == 0, -np.inf, i))
+    hi = np.minimum(xb[owners], np.where(i == cols - 1, np.inf, i + 1))
+    dx = x1 - x0
+    vertical = (dx == 0)
+    slope = (y1 - y0) / np.where(vertical, 1, dx)
+    ya = np.where(vertical[owners], y0[owners], y0[owners] + (lo - x0[owners]) * slope[owners])
+    yb = np.where(vertical[owners], y1[owners], y0[owners] + (hi - x0[owners]) * slope[owners])
+    j0 = np.clip(np.floor(np.minimum(ya, yb)), 0, rows - 1).astype(np.int64)
+    j1 = np.clip(np.floor(np.maximum(ya, yb)), 0, rows - 1).astype(np.int64)
+    return (owners, i, j0, j1)
+
+
+def polygon_column_runs(owners, x0, y0, x1, y1, cols, rows):
+    '''
+    same as segment_column_runs, but for polygons given as boundary segments with owners.
+    the rows a polygon covers in a column span from its lowest to highest segment crossing.
+    '''
+    runs, i, j0, j1 = segment_column_runs(x0, y0, x1, y1, cols, rows)
+    key = owners[runs] * cols + i
+    order = np.argsort(key, kind='mergesort')
+    key, j0, j1 = key[order], j0[order], j1[order]
+    starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    if not len(starts):
+        empty = np.zeros(0, dtype=np.int64)
+        return (empty, empty, empty, empty)
+    j0 = np.minimum.reduceat(j0, starts)
+    j1 = np.maximum.reduceat(j1, starts)
+    key = key[starts]
+    return (key // cols, key % cols, j0, j1)
@@ -34,12 +34,15 @@ Below are some related, interesting links
 import os
 import re
 import math
+import time
 import ctypes
 import traceback
+from itertools import chain
 
 import bmesh
 import bgl
 import bpy
+import numpy as np
 from bpy_extras.view3d_utils import (
     location_3d_to_region_2d, region_2d_to_vector_3d
 )
@@ -49,12 +52,15 @@ from bpy_extras.view3d_utils import (
 from mathutils import Vector, Matrix, Quaternion
 from mathutils.bvhtree import BVHTree
 
-from .debug import dprint
+from .debug import dprint, debugger
+from .decorators import blender_version_wrapper
 from .shaders import Shader, buf_zero
 from .utils import shorten_floats
 from .maths import Point, Direction, Frame, XForm
 from .maths import invert_matrix, matrix_normal
 from .profiler import profiler
+from .counters import counters
+from ..ext.bgl_ext import np_array_as_bgl_Buffer, get_clip_planes
 
 
 
@@ -330,18 +336,40 @@ def glDrawBMFaces(lbmf, opts=None, enableShader=True):
         bmeshShader.disable()
 
 
+def as_bgl_Buffer(gltype, shape, data):
+    '''
+    returns bgl.Buffer holding data.
+    NumPy arrays are wrapped without copying (converted first only if not contiguous or of a
+    different type); other sequences are copied into a new Buffer.
+    '''
+    if type(data) is np.ndarray:
+        dtype = {bgl.GL_FLOAT: np.float32, bgl.GL_INT: np.int32}[gltype]
+        data = np.ascontiguousarray(data, dtype=dtype).reshape(shape)
+        return np_array_as_bgl_Buffer(data)
+    return bgl.Buffer(gltype, shape, data)
+
+
 class BGLBufferedRender:
     DEBUG_PRINT = False
     DEBUG_CHKERR = False
 
-    def __init__(self, gltype):
+    def __init__(self, gltype, dynamic=False):
+        '''
+        dynamic buffers are allocated with GL_DYNAMIC_DRAW and extra capacity, so they can be
+        refilled without reallocating and partially updated with update_range
+        '''
         self.count = 0
+        self.vertex_count = 0
         self.gltype = gltype
         self.gltype_name, self.gl_count, self.options_prefix = {
             bgl.GL_POINTS:   ('points',    1, 'point'),
             bgl.GL_LINES:    ('lines',     2, 'line'),
             bgl.GL_TRIANGLES: ('triangles', 3, 'poly'),
         }[self.gltype]
+        self.dynamic = dynamic
+        self.usage = bgl.GL_DYNAMIC_DRAW if dynamic else bgl.GL_STATIC_DRAW
+        self.capacity = 0       # number of verts allocated in vbo_pos, vbo_norm, vbo_sel
+        self.capacity_idx = 0   # number of indices allocated in vbo_idx
 
         # self.vao = bgl.Buffer(bgl.GL_INT, 1)
         # bgl.glGenVertexArrays(1, self.vao)
@@ -360,10 +388,34 @@ class BGLBufferedRender:
         bgl.glDeleteBuffers(4, self.vbos)
         del self.vbos
 
+    def _grow_capacity(self, capacity, count):
+        # dynamic buffers at least double, so repeated growth is amortized
+        if not self.dynamic: return count
+        if count <= capacity: return capacity
+        return max(count, capacity * 2)
+
+    def _upload(self, target, vbo, width, buf, count, capacity, realloc, title):
+        sizeOfItem = 4
+        bgl.glBindBuffer(target, vbo)
+        if realloc and capacity == count:
+            bgl.glBufferData(target, count * width * sizeOfItem, buf, self.usage)
+        else:
+            if realloc:
+                # allocate whole capacity without initializing it (buf_zero is a null pointer),
+                # then fill in the used part
+                bgl.glBufferData(target, capacity * width * sizeOfItem, buf_zero, self.usage)
+            bgl.glBufferSubData(target, 0, count * width * sizeOfItem, buf)
+        self._check_error('buffer: %s' % title)
+
     @profiler.profile
     def buffer(self, pos, norm, sel, idx):
-        sizeOfFloat, sizeOfInt = 4, 4
+        '''
+        uploads vert positions (Nx3), normals (Nx3), selection (N), and optional indices.
+        contiguous float32 (int32 for idx) NumPy arrays are uploaded without any conversion.
+        '''
         self.count = 0
+        self.vertex_count = 0
+        self.render_indices = False
         count = len(pos)
         counts = list(map(len, [pos, norm, sel]))
 
@@ -374,62 +426,88 @@ class BGLBufferedRender:
         if count == 0:
             return
 
+        has_idx = idx is not None and len(idx) > 0
+        count_idx = len(idx) if has_idx else 0
+
         try:
-            buf_pos = bgl.Buffer(bgl.GL_FLOAT, [count, 3], pos)
-            buf_norm = bgl.Buffer(bgl.GL_FLOAT, [count, 3], norm)
-            buf_sel = bgl.Buffer(bgl.GL_FLOAT, count, sel)
-            if idx:
+            buf_pos = as_bgl_Buffer(bgl.GL_FLOAT, [count, 3], pos)
+            buf_norm = as_bgl_Buffer(bgl.GL_FLOAT, [count, 3], norm)
+            buf_sel = as_bgl_Buffer(bgl.GL_FLOAT, count, sel)
+            if has_idx:
                 # WHY NO GL_UNSIGNED_INT?????
-                buf_idx = bgl.Buffer(bgl.GL_INT, count, idx)
+                buf_idx = as_bgl_Buffer(bgl.GL_INT, count_idx, idx)
             if self.DEBUG_PRINT:
                 print('buf_pos  = ' + shorten_floats(str(buf_pos)))
                 print('buf_norm = ' + shorten_floats(str(buf_norm)))
-        except Exception as e:
-            print(
-                'ERROR (buffer): caught exception while '
-                'buffering to Buffer ' + str(e))
+        except Exception:
+            print('ERROR (buffer): caught exception while buffering to Buffer')
+            debugger.print_exception()
             raise e
+
+        capacity = self._grow_capacity(self.capacity, count)
+        realloc = not self.dynamic or capacity != self.capacity
+        capacity_idx = self._grow_capacity(self.capacity_idx, count_idx)
+        realloc_idx = not self.dynamic or capacity_idx != self.capacity_idx
         try:
-            bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, self.vbo_pos)
-            bgl.glBufferData(bgl.GL_ARRAY_BUFFER, count * 3 *
-                             sizeOfFloat, buf_pos,
-                             bgl.GL_STATIC_DRAW)
-            self._check_error('buffer: vbo_pos')
-            bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, self.vbo_norm)
-            bgl.glBufferData(bgl.GL_ARRAY_BUFFER, count * 3 *
-                             sizeOfFloat, buf_norm,
-                             bgl.GL_STATIC_DRAW)
-            self._check_error('buffer: vbo_norm')
-            bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, self.vbo_sel)
-            bgl.glBufferData(bgl.GL_ARRAY_BUFFER, count * 1 *
-                             sizeOfFloat, buf_sel,
-                             bgl.GL_STATIC_DRAW)
-            self._check_error('buffer: vbo_sel')
-            if idx:
-                bgl.glBindBuffer(bgl.GL_ELEMENT_ARRAY_BUFFER, self.vbo_idx)
-                bgl.glBufferData(bgl.GL_ELEMENT_ARRAY_BUFFER,
-                                 count * sizeOfInt, buf_idx,
-                                 bgl.GL_STATIC_DRAW)
-                self._check_error('buffer: vbo_idx')
-        except Exception as e:
-            print(
-                'ERROR (buffer): caught exception while '
-                'buffering from Buffer ' + str(e))
+            GL_ARRAY_BUFFER = bgl.GL_ARRAY_BUFFER
+            self._upload(GL_ARRAY_BUFFER, self.vbo_pos,  3, buf_pos,  count, capacity, realloc, 'vbo_pos')
+            self._upload(GL_ARRAY_BUFFER, self.vbo_norm, 3, buf_norm, count, capacity, realloc, 'vbo_norm')
+            self._upload(GL_ARRAY_BUFFER, self.vbo_sel,  1, buf_sel,  count, capacity, realloc, 'vbo_sel')
+            if has_idx:
+                self._upload(bgl.GL_ELEMENT_ARRAY_BUFFER, self.vbo_idx, 1, buf_idx, count_idx, capacity_idx, realloc_idx, 'vbo_idx')
+        except Exception:
+            print('ERROR (buffer): caught exception while buffering from Buffer')
+            debugger.print_exception()
             raise e
         finally:
             bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, 0)
             bgl.glBindBuffer(bgl.GL_ELEMENT_ARRAY_BUFFER, 0)
         del buf_pos, buf_norm, buf_sel
-        if idx:
+        if has_idx:
             del buf_idx
 
-        if idx:
-            self.count = len(idx)
+        self.capacity = capacity
+        if has_idx:
+            self.capacity_idx = capacity_idx
+        self.vertex_count = count
+        if has_idx:
+            self.count = count_idx
             self.render_indices = True
         else:
-            self.count = len(pos)
+            self.count = count
             self.render_indices = False
 
+    @profiler.profile
+    def update_range(self, start, count, pos=None, norm=None, sel=None):
+        '''
+        overwrites verts start..start+count-1 of previously buffered data with glBufferSubData.
+        only the given arrays (each with count elements) are uploaded.
+        '''
+        assert 0 <= start and start + count <= self.vertex_count, (
+            'Range %d+%d is outside of buffered verts (%d)' % (start, count, self.vertex_count))
+        if count == 0:
+            return
+
+        sizeOfFloat = 4
+        try:
+            for (vbo, width, data, title) in [
+                    (self.vbo_pos,  3, pos,  'vbo_pos'),
+                    (self.vbo_norm, 3, norm, 'vbo_norm'),
+                    (self.vbo_sel,  1, sel,  'vbo_sel'),
+                    ]:
+                if data is None: continue
+                assert len(data) == count, ('Array for %s must contain '
+                                            '%d elements (not %d)' % (title, count, len(data)))
+                shape = [count, width] if width > 1 else count
+                buf = as_bgl_Buffer(bgl.GL_FLOAT, shape, data)
+                bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, vbo)
+                bgl.glBufferSubData(bgl.GL_ARRAY_BUFFER, start * width * sizeOfFloat,
+                                    count * width * sizeOfFloat, buf)
+                self._check_error('update_range: %s' % title)
+                del buf
+        finally:
+            bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, 0)
+
     @profiler.profile
     def _check_error(self, title):
         if not self.DEBUG_CHKERR:
@@ -742,10 +820,70 @@ def glDrawBMVerts(lbmv, opts=None, enableShader=True):
         bmeshShader.disable()
 
 
+@blender_version_wrapper('>=', '2.80')
+def bmesh_loop_triangles(bme):
+    return bme.calc_loop_triangles()
+@blender_version_wrapper('<', '2.80')
+def bmesh_loop_triangles(bme):
+    return bme.calc_tessface()
+
+
+def cluster_arrays(arrays, res):
+    '''
+    decimates gathered arrays by clustering verts into a res^3 grid over their bounding box.
+    each cluster becomes one vert at the mean position; collapsed and duplicate triangles and
+    edges are dropped.
+    '''
+    co, norm = arrays['vert co'], arrays['vert norm']
+    co_min = co.min(axis=0)
+    co_size = np.maximum(co.max(axis=0) - co_min, 0.000001)
+    ijk = np.clip(((co - co_min) * (res / co_size)).astype(np.int64), 0, res - 1)
+    _, cluster = np.unique((ijk[:, 0] * res + ijk[:, 1]) * res + ijk[:, 2], return_inverse=True)
+    nc = cluster.max() + 1
+    counts = np.bincount(cluster, minlength=nc)
+    mean = lambda v: np.bincount(cluster, weights=v, minlength=nc) / counts
+    c_co = np.stack([mean(co[:, a]) for a in range(3)], axis=1).astype(np.float32)
+    c_norm = np.stack([mean(norm[:, a]) for a in range(3)], axis=1)
+    c_norm /= np.maximum(np.linalg.norm(c_norm, axis=1), 0.000001)[:, None]
+    c_sel = np.bincount(cluster, weights=arrays['vert sel'], minlength=nc) > 0
+
+    def remap(elems):
+        e = cluster[elems]
+        keep = np.all(e[:, [0] * (e.shape[1] - 1)] != e[:, 1:], axis=1)
+        if e.shape[1] == 3: keep &= e[:, 1] != e[:, 2]
+        keep = np.nonzero(keep)[0]
+        _, first = np.unique(np.sort(e[keep], axis=1), axis=0, return_index=True)
+        keep = keep[np.sort(first)]
+        return e[keep].astype(np.int32), keep
+
+    tri_verts, tris = remap(arrays['tri verts'])
+    edge_verts, edges = remap(arrays['edge verts'])
+    t_co = c_co[tri_verts]
+    tri_norm = np.cross(t_co[:, 1] - t_co[:, 0], t_co[:, 2] - t_co[:, 0])
+    tri_norm /= np.maximum(np.linalg.norm(tri_norm, axis=1), 0.000001)[:, None]
+    return {
+        'vert co': c_co,
+        'vert norm': c_norm.astype(np.float32),
+        'vert sel': c_sel,
+        'edge verts': edge_verts,
+        'edge sel': arrays['edge sel'][edges],
+        'tri verts': tri_verts,
+        'tri sel': arrays['tri sel'][tris],
+        'tri smooth': arrays['tri smooth'][tris],
+        'tri norm': tri_norm.astype(np.float32),
+    }
+
+
 class BMeshRender():
+    # level of detail settings (only used when created with lod=True)
+    lod_min_tris = 5000         # stop adding coarser levels once a level has fewer triangles
+    lod_max_levels = 6          # most levels, including full detail
+    lod_pixels_per_tri = 4.0    # screen area (pixels) each drawn triangle should cover at least
+    lod_frame_budget = None     # seconds; if set, levels coarsen while frames take longer
+    lod_navigate_levels = 2     # how many levels coarser to draw while navigating
+
     @profiler.profile
-    def __init__(self, obj, xform=None):
-        self.calllist = None
+    def __init__(self, obj, xform=None, lod=False):
         if type(obj) is bpy.types.Object:
             print('Creating BMeshRender for ' + obj.name)
             self.bme = bmesh.new()
@@ -761,51 +899,430 @@ class BMeshRender():
         self.buf_matrix_normal = self.xform.to_bglMatrix_Normal()
 
         self.is_dirty = True
-        self.calllist = bgl.glGenLists(1)
+        self.buffered_renders = []
+
+        self.lod = lod
+        self.lod_renders = []       # buffered renders for each level, full detail first
+        self.lod_tri_counts = []
+        self.lod_bbox = None        # 8x3 corners of mesh bounding box (model space)
+        self.lod_bias = 0           # extra coarsening from frame_budget
+        self.lod_last_draw = None
+        self.lod_last_view = None   # view matrix and distance at last draw (to detect navigation)
+        self.lod_level = 0          # level drawn last
 
     def replace_bmesh(self, bme):
         self.bme = bme
         self.is_dirty = True
 
-    def __del__(self):
-        if not self.calllist: return
-        bgl.glDeleteLists(self.calllist, 1)
-        self.calllist = None
-
     def dirty(self):
         self.is_dirty = True
 
+    @profiler.profile
+    def gather(self):
+        '''
+        reads verts, edges, and (triangulated) faces straight from bmesh into numpy arrays.
+        element indices are refreshed first, so array rows match bmv.index, bme.index, bmf.index.
+        returns dict of arrays
+        '''
+        bme = self.bme
+        bme.verts.index_update()
+        bme.edges.index_update()
+        bme.faces.index_update()
+        bmvs, bmes, bmfs = bme.verts, bme.edges, bme.faces
+        nv, ne, nf = len(bmvs), len(bmes), len(bmfs)
+        looptris = bmesh_loop_triangles(bme)
+        nt = len(looptris)
+        fromiter = lambda it, dtype, count: np.fromiter(it, dtype=dtype, count=count)
+        face_norm = fromiter(chain.from_iterable(bmf.normal for bmf in bmfs), np.float32, nf * 3).reshape((nf, 3))
+        face_sel = fromiter((bmf.select for bmf in bmfs), bool, nf)
+        face_smooth = fromiter((bmf.smooth for bmf in bmfs), bool, nf)
+        # loop triangles are ordered by face
+        tri_faces = fromiter((lt[0].face.index for lt in looptris), np.int64, nt)
+        return {
+            'vert co': fromiter(chain.from_iterable(bmv.co for bmv in bmvs), np.float32, nv * 3).reshape((nv, 3)),
+            'vert norm': fromiter(chain.from_iterable(bmv.normal for bmv in bmvs), np.float32, nv * 3).reshape((nv, 3)),
+            'vert sel': fromiter((bmv.select for bmv in bmvs), bool, nv),
+            'edge verts': fromiter((bmv.index for bme_ in bmes for bmv in bme_.verts), np.int32, ne * 2).reshape((ne, 2)),
+            'edge sel': fromiter((bme_.select for bme_ in bmes), bool, ne),
+            'tri verts': fromiter((l.vert.index for lt in looptris for l in lt), np.int32, nt * 3).reshape((nt, 3)),
+            'tri faces': tri_faces,
+            'tri sel': face_sel[tri_faces],
+            'tri smooth': face_smooth[tri_faces],
+            'tri norm': face_norm[tri_faces],
+        }
+
+    @profiler.profile
+    def buffer_arrays(self, arrays, tris=None, edges=None, verts=None, buffered_renders=None, dynamic=False):
+        '''
+        buffers gathered arrays (only the triangles, edges, verts at the given indices, if given)
+        into buffered_renders (new ones if None), returned as [faces, edges, verts]
+        '''
+        co, norm = arrays['vert co'], arrays['vert norm']
+        tri_verts, tri_smooth = arrays['tri verts'], arrays['tri smooth']
+        tri_norm, tri_sel = arrays['tri norm'], arrays['tri sel']
+        edge_verts, edge_sel = arrays['edge verts'], arrays['edge sel']
+        vert_sel = arrays['vert sel']
+        if tris is not None:
+            tri_verts, tri_smooth = tri_verts[tris], tri_smooth[tris]
+            tri_norm, tri_sel = tri_norm[tris], tri_sel[tris]
+        if edges is not None:
+            edge_verts, edge_sel = edge_verts[edges], edge_sel[edges]
+        if verts is not None:
+            vert_co, vert_norm, vert_sel = co[verts], norm[verts], vert_sel[verts]
+        else:
+            vert_co, vert_norm = co, norm
+
+        if buffered_renders is None:
+            buffered_renders = [
+                BGLBufferedRender(bgl.GL_TRIANGLES, dynamic=dynamic),
+                BGLBufferedRender(bgl.GL_LINES, dynamic=dynamic),
+                BGLBufferedRender(bgl.GL_POINTS, dynamic=dynamic),
+            ]
+        buf_faces, buf_edges, buf_verts = buffered_renders
+
+        # flat shaded triangles use the face normal at each corner, smooth use the vert normals
+        tri_norms = np.where(tri_smooth[:, None, None], norm[tri_verts], tri_norm[:, None, :])
+        buf_faces.buffer(
+            co[tri_verts].reshape((-1, 3)),
+            tri_norms.reshape((-1, 3)),
+            np.repeat(tri_sel, 3).astype(np.float32),
+            None,
+        )
+        buf_edges.buffer(
+            co[edge_verts].reshape((-1, 3)),
+            norm[edge_verts].reshape((-1, 3)),
+            np.repeat(edge_sel, 2).astype(np.float32),
+            None,
+        )
+        buf_verts.buffer(vert_co, vert_norm, vert_sel.astype(np.float32), None)
+
+        return buffered_renders
+
     @profiler.profile
     def clean(self, opts=None):
         if not self.is_dirty: return
 
         # make not dirty first in case bad things happen while drawing
         self.is_dirty = False
+        counters.incr('BMeshRender clean')
 
-        bgl.glNewList(self.calllist, bgl.GL_COMPILE)
-        # do not change attribs if they're not set
-        glSetDefaultOptions(opts=opts)
-        glDrawBMFaces(self.bme.faces, opts=opts, enableShader=False)
-        glDrawBMEdges(self.bme.edges, opts=opts, enableShader=False)
-        glDrawBMVerts(self.bme.verts, opts=opts, enableShader=False)
-        bgl.glDepthRange(0, 1)
-        bgl.glEndList()
+        arrays = self.gather()
+        counters.gauge('BMeshRender triangles', len(arrays['tri verts']))
+        self.buffered_renders = self.buffer_arrays(arrays)
+        if self.lod: self.build_lod(arrays)
+
+    @profiler.profile
+    def build_lod(self, arrays):
+        '''
+        precomputes decimated levels by vertex clustering, each with about 1/4 the verts of the
+        level before it
+        '''
+        self.lod_renders = [self.buffered_renders]
+        self.lod_tri_counts = [len(arrays['tri verts'])]
+        self.lod_bbox = None
+        co = arrays['vert co']
+        if not len(co): return
+        co_min, co_max = co.min(axis=0), co.max(axis=0)
+        self.lod_bbox = np.array([[x, y, z] for x in (co_min[0], co_max[0]) for y in (co_min[1], co_max[1]) for z in (co_min[2], co_max[2])])
+        # surfaces fill about res^2 cells, so start where clusters hold a few verts each
+        res = int(math.sqrt(len(co)) / 2)
+        while len(self.lod_renders) < self.lod_max_levels and self.lod_tri_counts[-1] > self.lod_min_tris and res >= 4:
+            level = cluster_arrays(arrays, res)
+            if len(level['tri verts']) >= self.lod_tri_counts[-1]: break
+            self.lod_renders.append(self.buffer_arrays(level))
+            self.lod_tri_counts.append(len(level['tri verts']))
+            res //= 2
+
+    def get_lod_level(self, opts):
+        '''
+        picks the coarsest level that still has enough triangles for the mesh's projected screen
+        size, then coarsens by frame_budget and navigation.  navigation is opts['navigating'] if
+        the caller sets it (ex: from CookieCutter actions.navigating()), otherwise any change of
+        the view since the last draw
+        '''
+        levels = len(self.lod_renders)
+        if levels <= 1: return 0
+
+        level = 0
+        region = bpy.context.region
+        r3d = bpy.context.space_data.region_3d
+        if self.lod_bbox is not None:
+            mx = np.dot(np.array(r3d.perspective_matrix), np.array(self.xform.mx_p))
+            p = np.dot(np.hstack((self.lod_bbox, np.ones((8, 1)))), mx.T)
+            if np.all(p[:, 3] > 0):
+                # mesh is entirely in front of the view, so the projected bbox bounds its screen size
+                ndc = p[:, :2] / p[:, 3:]
+                ndc = np.clip(ndc, -1, 1)
+                w, h = (ndc.max(axis=0) - ndc.min(axis=0)) * (region.width / 2, region.height / 2)
+                target = w * h / self.lod_pixels_per_tri
+                while level + 1 < levels and self.lod_tri_counts[level + 1] >= target:
+                    level += 1
+
+        if self.lod_frame_budget:
+            now = time.time()
+            if self.lod_last_draw is not None:
+                delta = now - self.lod_last_draw
+                if delta < 1.0:
+                    # ignore long gaps, which are idle time rather than slow frames
+                    if delta > self.lod_frame_budget: self.lod_bias = min(self.lod_bias + 1, levels - 1)
+                    elif delta < self.lod_frame_budget / 2: self.lod_bias = max(self.lod_bias - 1, 0)
+            self.lod_last_draw = now
+            level += self.lod_bias
+
+        navigating = opts.get('navigating', None)
+        view = tuple(chain.from_iterable(r3d.view_matrix)) + (r3d.view_distance,)
+        if navigating is None:
+            navigating = self.lod_last_view is not None and view != self.lod_last_view
+        self.lod_last_view = view
+        if navigating:
+            level += self.lod_navigate_levels
+
+        return min(level, levels - 1)
 
     @profiler.profile
     def draw(self, opts=None):
+        opts = opts or {}
         try:
             self.clean(opts=opts)
             bmeshShader.enable()
-            #bmeshShader.assign('matrix_m',  self.buf_matrix_model)
-            #bmeshShader.assign('matrix_mn', self.buf_matrix_normal)
+            # same model matrix (object's matrix_world) that get_lod_level projects lod_bbox with
+            bmeshShader.assign('matrix_m',  self.buf_matrix_model)
+            bmeshShader.assign('matrix_mn', self.buf_matrix_normal)
             #bmeshShader.assign('matrix_t', buf_matrix_target)
             #bmeshShader.assign('matrix_ti', buf_matrix_target_inv)
             #bmeshShader.assign('matrix_v', buf_matrix_view)
             #bmeshShader.assign('matrix_vn', buf_matrix_view_invtrans)
             #bmeshShader.assign('matrix_p', buf_matrix_proj)
             #bmeshShader.assign('dir_forward', view_forward)
-            bgl.glCallList(self.calllist)
-        except:
-            pass
+            # do not change attribs if they're not set
+            glSetDefaultOptions(opts=opts)
+            buffered_renders = self.buffered_renders
+            if self.lod:
+                self.lod_level = self.get_lod_level(opts)
+                buffered_renders = self.lod_renders[self.lod_level]
+            for buffered_render in buffered_renders:
+                buffered_render.draw(opts)
+            bgl.glDepthRange(0, 1)
+        except Exception:
+            print('Caught exception while trying to draw BMeshRender')
+            debugger.print_exception()
+        finally:
+            bmeshShader.disable()
+
+
+def get_frustum_planes(mx):
+    '''
+    returns 6x4 array of planes (ax+by+cz+d >= 0 is inside) bounding the frustum of the given
+    (perspective) matrix
+    '''
+    m = np.array(mx, dtype=np.float64)
+    return np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+
+
+def boxes_inside_planes(box_mins, box_maxs, planes):
+    '''
+    returns bool array of which axis-aligned boxes (Nx3 min and max corners) are not entirely
+    outside any of the planes (Px4).  conservative: a few boxes near frustum corners may pass.
+    '''
+    inside = np.ones(len(box_mins), dtype=bool)
+    for plane in planes:
+        # the corner farthest along the plane normal is the last to leave the inside
+        corner = np.where(plane[:3] >= 0, box_maxs, box_mins)
+        inside &= np.dot(corner, plane[:3]) + plane[3] >= 0
+    return inside
+
+
+class BMeshRenderChunked(BMeshRender):
+    '''
+    renders a bmesh split into spatially coherent chunks, each with its own buffers and bounding
+    box.  only chunks inside the view frustum (and clipping region, if set) are drawn, and after
+    dirty_verts() only those verts (and their neighbors, edges, and faces) are read from the bmesh
+    again, and only the chunks using them are rebuffered.
+    '''
+    chunk_tris = 20000     # target number of triangles per chunk
+
+    class Chunk:
+        def __init__(self, tris, edges, verts, arrays):
+            self.tris, self.edges, self.verts = tris, edges, verts
+            self.buffered_renders = None
+            self.bbox_min, self.bbox_max = None, None
+            # every vert this chunk draws, as part of a triangle, edge, or as a point
+            self.used_verts = np.unique(np.concatenate((
+                arrays['tri verts'][tris].ravel(), arrays['edge verts'][edges].ravel(), verts
+            )))
+
+        def buffer(self, bmesh_render, arrays):
+            co = arrays['vert co'][self.used_verts]
+            self.bbox_min, self.bbox_max = co.min(axis=0), co.max(axis=0)
+            self.buffered_renders = bmesh_render.buffer_arrays(
+                arrays, tris=self.tris, edges=self.edges, verts=self.verts,
+                buffered_renders=self.buffered_renders, dynamic=True,
+            )
+
+    def __init__(self, obj, xform=None):
+        super().__init__(obj, xform=xform)
+        self.chunks = []
+        self.vert_chunks = None     # CSR (offsets, chunk indices) of chunks using each vert
+        self.dirty_vert_indices = set()
+        self.arrays = None
+        self.arrays_nfaces = 0      # len(bme.faces) when self.arrays were gathered
+
+    def replace_bmesh(self, bme):
+        super().replace_bmesh(bme)
+        self.dirty_vert_indices = set()
+
+    def dirty(self):
+        super().dirty()
+        self.dirty_vert_indices = set()
+
+    def dirty_verts(self, bmverts):
+        '''
+        marks only the chunks that use the given verts as dirty.
+        topology must not have changed since last clean (use dirty() otherwise).  verts are
+        tracked by bmv.index, which every full clean refreshes (index_update), so the indices
+        are valid as long as no elements were added or removed since.
+        '''
+        self.dirty_vert_indices |= {bmv.index for bmv in bmverts}
+
+    @profiler.profile
+    def split_chunks(self, arrays):
+        ''' assigns triangles, edges, and verts to cells of a grid sized so each holds about chunk_tris triangles '''
+        co, tri_verts, edge_verts = arrays['vert co'], arrays['tri verts'], arrays['edge verts']
+        if not len(co): return []
+        cells = max(1, int(round((len(tri_verts) / self.chunk_tris) ** (1 / 3))))
+        co_min = co.min(axis=0)
+        co_size = np.maximum(co.max(axis=0) - co_min, 0.000001)
+        def cell_of(p):
+            ijk = np.clip(((p - co_min) * (cells / co_size)).astype(np.int64), 0, cells - 1)
+            return (ijk[:, 0] * cells + ijk[:, 1]) * cells + ijk[:, 2]
+        tri_cells = cell_of(co[tri_verts].mean(axis=1))
+        edge_cells = cell_of(co[edge_verts].mean(axis=1))
+        vert_cells = cell_of(co)
+        groups = lambda c: np.split(np.argsort(c, kind='mergesort'), np.cumsum(np.bincount(c, minlength=cells ** 3))[:-1])
+        return [
+            BMeshRenderChunked.Chunk(tris, edges, verts, arrays)
+            for (tris, edges, verts) in zip(groups(tri_cells), groups(edge_cells), groups(vert_cells))
+            if len(tris) or len(edges) or len(verts)
+        ]
+
+    def map_verts_to_chunks(self, nverts):
+        ''' builds CSR of the chunks that use each vert (a vert on a chunk boundary is in several) '''
+        vis = np.concatenate([chunk.used_verts for chunk in self.chunks] or [np.zeros(0, dtype=np.int64)])
+        cis = np.repeat(np.arange(len(self.chunks)), [len(chunk.used_verts) for chunk in self.chunks])
+        order = np.argsort(vis, kind='mergesort')
+        offsets = np.zeros(nverts + 1, dtype=np.int64)
+        np.cumsum(np.bincount(vis, minlength=nverts), out=offsets[1:])
+        self.vert_chunks = (offsets, cis[order])
+
+    @profiler.profile
+    def update_arrays(self, vert_indices):
+        '''
+        re-reads only the given verts, their neighbors (whose normals move with them), and their
+        edges and faces from bmesh into self.arrays.  returns indices of all verts re-read, or
+        None if bmesh no longer matches self.arrays (topology changed)
+        '''
+        arrays, bme = self.arrays, self.bme
+        nv, ne, nt = len(arrays['vert co']), len(arrays['edge verts']), len(arrays['tri verts'])
+        if len(bme.verts) != nv or len(bme.edges) != ne: return None
+        if len(bme.faces) != self.arrays_nfaces: return None
+        # each face of n verts has n-2 loop triangles
+        if sum(len(bmf.verts) for bmf in bme.faces) - 2 * len(bme.faces) != nt: return None
+        if len(vert_indices) and (vert_indices.min() < 0 or vert_indices.max() >= nv): return None
+        bme.verts.ensure_lookup_table()
+        bmvs = [bme.verts[i] for i in vert_indices.tolist()]
+        bmes = list({bme_ for bmv in bmvs for bme_ in bmv.link_edges})
+        bmfs = list({bmf for bmv in bmvs for bmf in bmv.link_faces})
+        ring = list({bmv for bme_ in bmes for bmv in bme_.verts} | set(bmvs))
+
+        vis = np.array([bmv.index for bmv in ring], dtype=np.int64)
+        arrays['vert co'][vis] = [tuple(bmv.co) for bmv in ring]
+        arrays['vert norm'][vis] = [tuple(bmv.normal) for bmv in ring]
+        arrays['vert sel'][vis] = [bmv.select for bmv in ring]
+        if bmes:
+            eis = np.array([bme_.index for bme_ in bmes], dtype=np.int64)
+            arrays['edge sel'][eis] = [bme_.select for bme_ in bmes]
+        if bmfs:
+            # loop triangles are ordered by face, so each face's triangles are one range
+            fis = np.array([bmf.index for bmf in bmfs], dtype=np.int64)
+            tri_faces = arrays['tri faces']
+            starts = np.searchsorted(tri_faces, fis, side='left')
+            ends = np.searchsorted(tri_faces, fis, side='right')
+            counts = ends - starts
+            tis = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            face_norm = np.array([tuple(bmf.normal) for bmf in bmfs], dtype=np.float32)
+            arrays['tri norm'][tis] = np.repeat(face_norm, counts, axis=0)
+            arrays['tri sel'][tis] = np.repeat([bmf.select for bmf in bmfs], counts)
+            arrays['tri smooth'][tis] = np.repeat([bmf.smooth for bmf in bmfs], counts)
+        return vis
+
+    @profiler.profile
+    def clean(self, opts=None):
+        if not self.is_dirty and not self.dirty_vert_indices: return
+
+        # make not dirty first in case bad things happen while drawing
+        full = self.is_dirty
+        dirty_verts = np.array(sorted(self.dirty_vert_indices), dtype=np.int64)
+        self.is_dirty = False
+        self.dirty_vert_indices = set()
+
+        if not full and self.arrays is not None:
+            vis = self.update_arrays(dirty_verts)
+            if vis is not None:
+                pr = profiler.start('rebuffering dirty chunks')
+                counters.incr('BMeshRenderChunked partial clean')
+                offsets, cis = self.vert_chunks
+                dirty_chunks = np.unique(np.concatenate(
+                    [cis[offsets[vi]:offsets[vi + 1]] for vi in vis.tolist()] or [np.zeros(0, dtype=np.int64)]
+                ))
+                for ci in dirty_chunks.tolist():
+                    counters.incr('BMeshRenderChunked chunk rebuffer')
+                    self.chunks[ci].buffer(self, self.arrays)
+                pr.done()
+                return
+
+        arrays = self.gather()
+        self.arrays = arrays
+        self.arrays_nfaces = len(self.bme.faces)
+        counters.incr('BMeshRender clean')
+        counters.gauge('BMeshRender triangles', len(arrays['tri verts']))
+        self.chunks = self.split_chunks(arrays)
+        for chunk in self.chunks:
+            chunk.buffer(self, arrays)
+        self.map_verts_to_chunks(len(arrays['vert co']))
+
+    def get_visible_chunks(self):
+        if not self.chunks: return []
+        r3d = bpy.context.space_data.region_3d
+        # same model matrix that draw assigns to the shader (matrix_m)
+        mx_model = np.array(self.xform.mx_p, dtype=np.float64)
+        planes = get_frustum_planes(r3d.perspective_matrix)
+        clip = get_clip_planes(r3d)
+        if clip:
+            planes = np.concatenate((planes, np.array(clip.to_list(), dtype=np.float64)))
+        # move planes into model space, so the chunk boxes can be tested as they are
+        planes = np.dot(planes, mx_model)
+        box_mins = np.array([chunk.bbox_min for chunk in self.chunks])
+        box_maxs = np.array([chunk.bbox_max for chunk in self.chunks])
+        inside = boxes_inside_planes(box_mins, box_maxs, planes)
+        return [chunk for (chunk, i) in zip(self.chunks, inside) if i]
+
+    @profiler.profile
+    def draw(self, opts=None):
+        opts = opts or {}
+        try:
+            self.clean(opts=opts)
+            bmeshShader.enable()
+            # chunks are culled in model space (see get_visible_chunks), so draw with same matrix
+            bmeshShader.assign('matrix_m',  self.buf_matrix_model)
+            bmeshShader.assign('matrix_mn', self.buf_matrix_normal)
+            # do not change attribs if they're not set
+            glSetDefaultOptions(opts=opts)
+            for chunk in self.get_visible_chunks():
+                for buffered_render in chunk.buffered_renders:
+                    buffered_render.draw(opts)
+            bgl.glDepthRange(0, 1)
+        except Exception:
+            print('Caught exception while trying to draw BMeshRenderChunked')
+            debugger.print_exception()
         finally:
             bmeshShader.disable()
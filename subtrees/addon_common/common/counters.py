@@ -0,0 +1,116 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import os
+import json
+import time
+
+
+class Counters:
+    '''
+    named counters (number of times an event happened) and gauges (last reported value) for hot
+    paths, such as raycasts, BVH and Accel2D builds, and draw calls.
+    incrementing is a single dict update, so call sites do not need to check whether anyone is
+    looking.
+    '''
+    rate_interval = 1.0     # seconds between snapshots used for recent rates
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts = {}
+        self.gauges = {}
+        self.clear_time = time.time()
+        self.rate_time = self.clear_time
+        self.rate_counts = {}
+        self.rates = {}
+
+    def incr(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def get(self, name):
+        return self.counts.get(name, self.gauges.get(name, None))
+
+    def update_rates(self):
+        ''' recomputes per second rates of counters over most recent interval '''
+        now = time.time()
+        delta = now - self.rate_time
+        if delta < self.rate_interval: return
+        self.rates = {
+            name: (count - self.rate_counts.get(name, 0)) / delta
+            for (name, count) in self.counts.items()
+        }
+        self.rate_counts = dict(self.counts)
+        self.rate_time = now
+
+    def to_dict(self):
+        self.update_rates()
+        run = max(time.time() - self.clear_time, 0.000001)
+        return {
+            'run': run,
+            'counters': {
+                name: {
+                    'count': count,
+                    'per second': count / run,
+                    'recent per second': self.rates.get(name, 0.0),
+                }
+                for (name, count) in self.counts.items()
+            },
+            'gauges': dict(self.gauges),
+        }
+
+    def strout(self):
+        d = self.to_dict()
+        s = [
+            'Counters:',
+            '  run: %6.2fsecs' % d['run'],
+            '     count      /sec    recent - counter',
+        ]
+        for name in sorted(d['counters']):
+            c = d['counters'][name]
+            s += ['  %8d  %8.2f  %8.2f - %s' % (c['count'], c['per second'], c['recent per second'], name)]
+        if d['gauges']:
+            s += ['Gauges:']
+            for name in sorted(d['gauges']):
+                s += ['  %16s - %s' % (str(d['gauges'][name]), name)]
+        return '\n'.join(s)
+
+    def printout(self):
+        print('%s\n\n\n' % self.strout())
+
+    def dump(self, filename=None):
+        '''
+        writes counters and gauges as json to filename (Counters.json in addon_common if None).
+        returns filename
+        '''
+        if not filename:
+            # .. back to addon_common root
+            path = os.path.dirname(os.path.abspath(__file__))
+            filename = os.path.join(path, '..', 'Counters.json')
+        with open(filename, 'wt') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return filename
+
+counters = Counters()
@@ -54,6 +54,7 @@ from mathutils.geometry import (
 from .globals import set_global, get_global
 from .blender import show_blender_popup
 from .hasher import Hasher
+from .maths import space_evenly_on_path as maths_space_evenly_on_path
 
 
 class Debugger:
@@ -313,74 +314,8 @@ def space_evenly_on_path(verts, edges, segments, shift = 0, debug = False):  #pr
             print('not shifting because this is not a cyclic vert chain')
             shift = 0
 
-    #calc_length
-    arch_len = 0
-    cumulative_lengths = [0]#TODO, make this the right size and dont append
-    for i in range(0,len(verts)-1):
-        v0 = verts[i]
-        v1 = verts[i+1]
-        V = v1-v0
-        arch_len += V.length
-        cumulative_lengths.append(arch_len)
-
-    if cyclic:
-        v0 = verts[-1]
-        v1 = verts[0]
-        V = v1-v0
-        arch_len += V.length
-        cumulative_lengths.append(arch_len)
-        #print(cumulative_lengths)
-
-    #identify vert indicies of import
-    #this will be the largest vert which lies at
-    #no further than the desired fraction of the curve
-
-    #initialze new vert array and seal the end points
-    if cyclic:
-        new_verts = [[None]]*(segments)
-        #new_verts[0] = verts[0]
-
-    else:
-        new_verts = [[None]]*(segments + 1)
-        new_verts[0] = verts[0]
-        new_verts[-1] = verts[-1]
-
-
-    n = 0 #index to save some looping through the cumulative lengths list
-          #now we are leaving it 0 becase we may end up needing the beginning of the loop last
-          #and if we are subdividing, we may hit the same cumulative lenght several times.
-          #for now, use the slow and generic way, later developsomething smarter.
-    for i in range(0,segments- 1 + cyclic * 1):
-        desired_length_raw = (i + 1 + cyclic * -1)/segments * arch_len + shift * arch_len / segments
-        #print('the length we desire for the %i segment is %f compared to the total length which is %f' % (i, desired_length_raw, arch_len))
-        #like a mod function, but for non integers?
-        if desired_length_raw > arch_len:
-            desired_length = desired_length_raw - arch_len
-        elif desired_length_raw < 0:
-            desired_length = arch_len + desired_length_raw #this is the end, + a negative number
-        else:
-            desired_length = desired_length_raw
-
-        #find the original vert with the largets legnth
-        #not greater than the desired length
-        #I used to set n = J after each iteration
-        for j in range(n, len(verts)+1):
-
-            if cumulative_lengths[j] > desired_length:
-                #print('found a greater length at vert %i' % j)
-                #this was supposed to save us some iterations so that
-                #we don't have to start at the beginning each time....
-                #if j >= 1:
-                    #n = j - 1 #going one back allows us to space multiple verts on one edge
-                #else:
-                    #n = 0
-                break
-
-        extra = desired_length - cumulative_lengths[j-1]
-        if j == len(verts):
-            new_verts[i + 1 + cyclic * -1] = verts[j-1] + extra * (verts[0]-verts[j-1]).normalized()
-        else:
-            new_verts[i + 1 + cyclic * -1] = verts[j-1] + extra * (verts[j]-verts[j-1]).normalized()
+    # same resampling as maths.space_evenly_on_path (vectorized)
+    new_verts = maths_space_evenly_on_path(verts, segments, cyclic=cyclic, shift=shift, debug=debug)
 
     eds = []
 
@@ -390,8 +325,6 @@ def space_evenly_on_path(verts, edges, segments, shift = 0, debug = False):  #pr
         #close the loop
         eds.append((i+1,0))
     if debug:
-        print(cumulative_lengths)
-        print(arch_len)
         print(eds)
 
     return new_verts, eds
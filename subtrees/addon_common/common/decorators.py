@@ -20,18 +20,138 @@ Created by Jonathan Denning, Jonathan Williamson
 '''
 
 import os
+import csv
 import json
 import time
+import atexit
 import inspect
+import threading
 
 import bpy
 
+from .profiler import swap_wrappers
+
+
+class CallStats:
+    '''
+    thread-safe call statistics for one function: count, total, min, max, and a histogram of
+    latencies with power-of-two microsecond buckets (bucket b holds latencies < 2^b us)
+    '''
+    buckets = 32
+
+    def __init__(self, filename, clsname, linenum, fnname):
+        self.lock = threading.Lock()
+        self.filename = filename
+        self.clsname = clsname
+        self.linenum = linenum
+        self.fileline = '%s:%d' % (filename, linenum)
+        self.fnname = fnname
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+            self.total = 0.0
+            self.min = float('inf')
+            self.max = 0.0
+            self.histogram = [0] * self.buckets
+
+    def add(self, delta):
+        bucket = min(int(delta * 1000000).bit_length(), self.buckets - 1)
+        with self.lock:
+            self.count += 1
+            self.total += delta
+            if delta < self.min: self.min = delta
+            if delta > self.max: self.max = delta
+            self.histogram[bucket] += 1
+
+    def snapshot(self):
+        ''' returns (count, total, min, max, histogram) as of one moment '''
+        with self.lock:
+            return (self.count, self.total, self.min, self.max, list(self.histogram))
+
+    def percentile(self, p):
+        '''
+        returns estimated latency (seconds) at percentile p (0-100), interpolating within the
+        histogram bucket that holds it
+        '''
+        return self._percentile(self.snapshot(), p)
+
+    @staticmethod
+    def _percentile(snapshot, p):
+        count, _, mn, mx, histogram = snapshot
+        if not count: return 0.0
+        target = count * p / 100
+        seen = 0
+        for bucket,n in enumerate(histogram):
+            if not n: continue
+            if seen + n >= target:
+                lo = 0 if bucket == 0 else 2 ** (bucket - 1) / 1000000
+                hi = 2 ** bucket / 1000000
+                v = lo + (hi - lo) * (target - seen) / n
+                return max(mn, min(mx, v))
+            seen += n
+        return mx
+
+    def to_dict(self, percentiles=(50, 90, 95, 99)):
+        snapshot = self.snapshot()
+        count, total, mn, mx, histogram = snapshot
+        d = {
+            'class': self.clsname,
+            'func': self.fnname,
+            'location': self.fileline,
+            'count': count,
+            'total': total,
+            'average': total / count if count else 0.0,
+            'min': mn if count else 0.0,
+            'max': mx,
+        }
+        for p in percentiles:
+            d['p%d' % p] = self._percentile(snapshot, p)
+        d['histogram'] = histogram
+        return d
+
+
+class StatsRegistry:
+    '''
+    registry of CallStats for functions decorated with stats_wrapper.
+    collecting starts on if ADDON_COMMON_STATS=1 is set in environment before starting blender,
+    and can be turned on or off at any time with set_stats_enabled.  while off, decorated
+    functions run unwrapped, costing nothing.
+    '''
+    def __init__(self):
+        self.enabled = os.environ.get('ADDON_COMMON_STATS', '0') not in {'', '0'}
+        self.stats = {}
+        self.wrappers = []      # (module name, qualname, fn, wrapper) for swap_wrappers
+        self.lock = threading.Lock()
+
+    def register(self, key, filename, clsname, linenum, fnname):
+        with self.lock:
+            if key not in self.stats:
+                self.stats[key] = CallStats(filename, clsname, linenum, fnname)
+            return self.stats[key]
+
+    def set_enabled(self, v):
+        v = bool(v)
+        if self.enabled == v: return
+        self.enabled = v
+        swap_wrappers(self.wrappers, v)
+
+    def clear(self):
+        for entry in list(self.stats.values()):
+            entry.clear()
+
+    def report(self, percentiles=(50, 95, 99)):
+        return [self.stats[key].to_dict(percentiles=percentiles) for key in sorted(self.stats)]
+
+stats_registry = StatsRegistry()
+
+def set_stats_enabled(v): stats_registry.set_enabled(v)
+def get_stats_enabled(): return stats_registry.enabled
+def stats_clear(): stats_registry.clear()
 
-def stats_wrapper(fn):
-    return fn
 
-    if not hasattr(stats_report, 'stats'):
-        stats_report.stats = dict()
+def stats_wrapper(fn):
     frame = inspect.currentframe().f_back
     f_locals = frame.f_locals
 
@@ -43,54 +163,49 @@ def stats_wrapper(fn):
         clsname + ('.' if clsname else ''),
         fnname, filename, linenum
     )
-    stats = stats_report.stats
-    stats[key] = {
-        'filename': filename,
-        'clsname': clsname,
-        'linenum': linenum,
-        'fileline': '%s:%d' % (filename, linenum),
-        'fnname': fnname,
-        'count': 0,
-        'total time': 0,
-        'average time': 0,
-    }
+    entry = stats_registry.register(key, filename, clsname, linenum, fnname)
 
     def wrapped(*args, **kwargs):
-        time_beg = time.time()
-        ret = fn(*args, **kwargs)
-        time_end = time.time()
-        time_delta = time_end - time_beg
-        d = stats[key]
-        d['count'] += 1
-        d['total time'] += time_delta
-        d['average time'] = d['total time'] / d['count']
-        return ret
-    return wrapped
+        if not stats_registry.enabled:
+            return fn(*args, **kwargs)
+        time_beg = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            entry.add(time.perf_counter() - time_beg)
+    wrapped.__name__ = fn.__name__
+    wrapped.__qualname__ = fn.__qualname__
+    wrapped.__module__ = fn.__module__
+    wrapped.__doc__ = fn.__doc__
+
+    # nested functions cannot be swapped later, so they always get wrapped (see profiler.profile)
+    if '<locals>' in fn.__qualname__: return wrapped
+    # return fn directly while disabled; set_stats_enabled swaps wrapped in when enabled
+    stats_registry.wrappers.append((fn.__module__, fn.__qualname__, fn, wrapped))
+    return wrapped if stats_registry.enabled else fn
 
 
 def stats_report():
-    return
-
-    stats = stats_report.stats if hasattr(stats_report, 'stats') else dict()
-    l = max(len(k) for k in stats)
-
-    def fmt(s):
-        return s + ' ' * (l - len(s))
+    stats = [row for row in stats_registry.report() if row['count']]
+    if not stats: return
 
     print()
     print('Call Statistics Report')
 
     cols = [
-        ('class', 'clsname', '%s'),
-        ('func', 'fnname', '%s'),
-        ('location', 'fileline', '%s'),
-        # ('line','linenum','% 10d'),
+        ('class', 'class', '%s'),
+        ('func', 'func', '%s'),
+        ('location', 'location', '%s'),
         ('count', 'count', '% 8d'),
-        ('total (sec)', 'total time', '% 10.4f'),
-        ('avg (sec)', 'average time', '% 10.6f'),
+        ('total (sec)', 'total', '% 10.4f'),
+        ('avg (sec)', 'average', '% 10.6f'),
+        ('min (sec)', 'min', '% 10.6f'),
+        ('p50 (sec)', 'p50', '% 10.6f'),
+        ('p95 (sec)', 'p95', '% 10.6f'),
+        ('p99 (sec)', 'p99', '% 10.6f'),
+        ('max (sec)', 'max', '% 10.6f'),
     ]
-    data = [stats[k] for k in sorted(stats)]
-    data = [[h] + [f % row[c] for row in data] for (h, c, f) in cols]
+    data = [[h] + [f % row[c] for row in stats] for (h, c, f) in cols]
     colwidths = [max(len(d) for d in col) for col in data]
     totwidth = sum(colwidths) + len(colwidths) - 1
 
@@ -107,6 +222,23 @@ def stats_report():
         printrow(i)
 
 
+def stats_dump(filename, format=None):
+    '''
+    writes call statistics to filename as csv or json (guessed from extension if format is None)
+    '''
+    if format is None: format = 'json' if filename.lower().endswith('.json') else 'csv'
+    assert format in {'csv', 'json'}, 'Unknown stats format "%s"' % format
+    stats = stats_registry.report(percentiles=(50, 90, 95, 99))
+    with open(filename, 'wt', newline='') as f:
+        if format == 'json':
+            json.dump(stats, f, indent=2)
+        else:
+            fields = [k for k in (stats[0].keys() if stats else []) if k != 'histogram']
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(stats)
+
+
 class LimitRecursion:
     def __init__(self, count, def_ret):
         self.count = count
@@ -171,10 +303,79 @@ def blender_version_wrapper(op, ver):
     return wrapit
 
 class PersistentOptions:
+    class Writer:
+        '''
+        writes options files on a background thread, so modal thread never waits on the disk.
+        callers hand over already serialized text, so the thread never reads live options.
+        changes to the same file are coalesced (only latest is written), and each file is written
+        to a temp file then renamed, so a crash mid-write never leaves a truncated options file.
+        '''
+        def __init__(self):
+            self._cond = threading.Condition()
+            self._io_lock = threading.Lock()    # held while writing; flush waits on in-progress writes
+            self._pending = {}                  # filename -> (time to write, json text)
+            self._thread = None
+
+        def write(self, filename, text, delay=0.0):
+            with self._cond:
+                when = time.time() + delay
+                if filename in self._pending:
+                    # keep earlier deadline, so a stream of changes still gets written
+                    when = min(when, self._pending[filename][0])
+                self._pending[filename] = (when, text)
+                if not self._thread:
+                    self._thread = threading.Thread(target=self._run, name='PersistentOptions writer', daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+
+        def flush(self, filename=None):
+            '''
+            writes pending changes (of filename, or all files if None) now, on calling thread
+            '''
+            with self._io_lock:
+                with self._cond:
+                    fns = [filename] if filename else list(self._pending.keys())
+                    jobs = [(fn, self._pending.pop(fn)[1]) for fn in fns if fn in self._pending]
+                for (fn, text) in jobs: self._write_file(fn, text)
+
+        def _ready(self):
+            now = time.time()
+            return [fn for (fn, (when, _)) in self._pending.items() if when <= now]
+
+        def _run(self):
+            while True:
+                with self._cond:
+                    while not self._ready():
+                        if self._pending:
+                            wait = min(when for (when, _) in self._pending.values()) - time.time()
+                            self._cond.wait(max(wait, 0.001))
+                        else:
+                            self._cond.wait()
+                with self._io_lock:
+                    with self._cond:
+                        jobs = [(fn, self._pending.pop(fn)[1]) for fn in self._ready()]
+                    for (fn, text) in jobs: self._write_file(fn, text)
+
+        def _write_file(self, filename, text):
+            fntmp = '%s.%d.tmp' % (filename, os.getpid())
+            try:
+                with open(fntmp, 'wt') as f:
+                    f.write(text)
+                os.replace(fntmp, filename)
+            except Exception as e:
+                print('Exception caught while trying to write options to "%s"' % filename)
+                print(str(e))
+
+    writer = Writer()
+
+    @staticmethod
+    def flush_all():
+        ''' writes all pending options changes now (call on operator end and addon unregister) '''
+        PersistentOptions.writer.flush()
+
     class WrappedDict:
         def __init__(self, cls, filename, version, defaults, update_external):
             self._dirty = False
-            self._last_save = time.time()
             self._write_delay = 2.0
             self._defaults = defaults
             self._update_external = update_external
@@ -198,15 +399,22 @@ class PersistentOptions:
             self._dirty = True
             self.update_external()
         def clean(self, force=False):
-            if not force:
-                if not self._dirty:
-                    return
-                if time.time() < self._last_save + self._write_delay:
-                    return
+            if not force and not self._dirty:
+                return
             if self._fndb:
-                json.dump(self._dict, open(self._fndb, 'wt'), indent=2, sort_keys=True)
+                # serialize here, so nested values cannot change under writer thread
+                try:
+                    text = json.dumps(self._dict, indent=2, sort_keys=True)
+                except Exception as e:
+                    print('Exception caught while trying to serialize options for "%s"' % self._fndb)
+                    print(str(e))
+                    return
+                PersistentOptions.writer.write(self._fndb, text, delay=0.0 if force else self._write_delay)
+                if force: self.flush()
             self._dirty = False
-            self._last_save = time.time()
+        def flush(self):
+            if self._fndb:
+                PersistentOptions.writer.flush(self._fndb)
         def read(self):
             self._dict = {}
             if self._fndb and os.path.exists(self._fndb):
@@ -280,8 +488,10 @@ class PersistentOptions:
                 self._db.reset()
             def clean(self):
                 self._db.clean()
+            def flush(self):
+                self._db.flush()
             def gettersetter(self, key, fn_get_wrap=None, fn_set_wrap=None):
                 return self._db.gettersetter(key, fn_get_wrap=fn_get_wrap, fn_set_wrap=fn_set_wrap)
         return WrappedClass
 
-
+atexit.register(PersistentOptions.flush_all)
@@ -28,10 +28,12 @@ import traceback
 import functools
 import urllib.request
 from itertools import chain
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 import bpy
 import bgl
+import numpy as np
 # import blf
 from bpy.types import BoolProperty
 from mathutils import Matrix
@@ -49,6 +51,7 @@ class Drawing:
     _instance = None
     _dpi = 72
     _dpi_mult = 1
+    size_cache_max = 20000      # most text size entries to keep (least recently used are dropped)
 
     @staticmethod
     @blender_version_wrapper('<','2.79')
@@ -93,7 +96,9 @@ class Drawing:
         self.fontsize = None
         self.fontsize_scaled = None
         self.line_cache = {}
-        self.size_cache = {}
+        self.size_cache = OrderedDict()
+        self.size_cache_hits = 0
+        self.size_cache_misses = 0
         self.set_font_size(12)
 
     def set_region(self, space, rgn, r3d, window):
@@ -155,9 +160,14 @@ class Drawing:
         else: text, lines = text, text.splitlines()
 
         fontid = fm.load(fontid)
-        key = (text, self.fontsize_scaled, fontid)
+        key = (text, fontid, self.fontsize, self._dpi_mult)
         # key = (text, self.fontsize_scaled, self.font_id)
-        if key not in self.size_cache:
+        d = self.size_cache.get(key, None)
+        if d is not None:
+            self.size_cache_hits += 1
+            self.size_cache.move_to_end(key)
+        else:
+            self.size_cache_misses += 1
             d = {}
             if not text:
                 d['width'] = 0
@@ -172,8 +182,23 @@ class Drawing:
                 d['height'] = get_height(text)
                 d['line height'] = self.line_height * len(lines)
             self.size_cache[key] = d
+            if len(self.size_cache) > self.size_cache_max:
+                self.size_cache.popitem(last=False)
         if fontsize: self.set_font_size(size_prev, fontid=fontid)
-        return self.size_cache[key][item]
+        return d[item]
+
+    def get_text_size_cache_stats(self):
+        return {
+            'size': len(self.size_cache),
+            'max': self.size_cache_max,
+            'hits': self.size_cache_hits,
+            'misses': self.size_cache_misses,
+        }
+
+    def clear_text_size_cache(self):
+        self.size_cache.clear()
+        self.size_cache_hits = 0
+        self.size_cache_misses = 0
 
     def get_text_width(self, text, fontsize=None):
         return self.get_text_size_info(text, 'width', fontsize=fontsize)
@@ -360,6 +385,22 @@ class Drawing:
     def Point_to_Point2D(self, p3d):
         return Point2D(location_3d_to_region_2d(self.rgn, self.r3d, p3d))
 
+    def Points_to_Point2Ds(self, p3ds):
+        '''
+        projects an Nx3 array of points with one matrix multiply (same as Point_to_Point2D)
+        returns an Nx2 array; points behind the view are nan
+        '''
+        p3ds = np.asarray(p3ds, dtype=np.float64).reshape((-1, 3))
+        mvp = np.array(self.r3d.perspective_matrix, dtype=np.float64)
+        prj = np.dot(p3ds, mvp[:, :3].T) + mvp[:, 3]
+        w = prj[:, 3]
+        front = w > 0.0
+        hw, hh = self.rgn.width / 2.0, self.rgn.height / 2.0
+        p2ds = np.full((len(p3ds), 2), np.nan)
+        p2ds[front, 0] = hw + hw * (prj[front, 0] / w[front])
+        p2ds[front, 1] = hh + hh * (prj[front, 1] / w[front])
+        return p2ds
+
 class ScissorStack:
     context = None
     buf = bgl.Buffer(bgl.GL_INT, 4)
@@ -367,6 +408,7 @@ class ScissorStack:
     started = False
     scissor_enabled = False
     stack = None
+    saved = None
 
     @staticmethod
     def start(context):
@@ -393,6 +435,26 @@ class ScissorStack:
             bgl.glDisable(bgl.GL_SCISSOR_TEST)
         ScissorStack.started = False
 
+    @staticmethod
+    def start_offscreen(l, t, w, h):
+        '''
+        redirects scissor stack to an offscreen buffer of size (w,h) that holds the region rect
+        with upper-left corner at (l,t).  must be matched with end_offscreen()
+        '''
+        assert ScissorStack.started
+        ScissorStack.saved = (ScissorStack.box, ScissorStack.stack)
+        ScissorStack.box = (-l, h - t, w, h)
+        ScissorStack.stack = [(0, 0, w, h)]
+        ScissorStack._set_scissor()
+
+    @staticmethod
+    def end_offscreen():
+        assert ScissorStack.started
+        assert len(ScissorStack.stack) == 1, 'stack size = %d (not 1)' % len(ScissorStack.stack)
+        ScissorStack.box, ScissorStack.stack = ScissorStack.saved
+        ScissorStack.saved = None
+        ScissorStack._set_scissor()
+
     @staticmethod
     def _set_scissor():
         assert ScissorStack.started and ScissorStack.stack
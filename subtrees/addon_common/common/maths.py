@@ -21,14 +21,18 @@ Created by Jonathan Denning, Jonathan Williamson
 
 from math import sqrt, acos, cos, sin
 from typing import List
+from itertools import chain
 
 import bgl
+import numpy as np
 from mathutils import Matrix, Vector, Quaternion
 from bmesh.types import BMVert
 from mathutils.geometry import intersect_line_plane, intersect_point_tri
 
+from .binning import bins_from_cells, cells_in_rects, segment_column_runs, polygon_column_runs
 from .decorators import stats_wrapper
 from .profiler import profiler
+from .counters import counters
 
 
 '''
@@ -918,6 +922,15 @@ class Accel2D:
     bin_cols = 20
     bin_rows = 20
 
+    # adaptive binning: grid is sized so each bin holds about bin_density elements
+    bin_adaptive = False
+    bin_density = 8
+    bin_max = 256       # max bins along either axis
+    bin_min_size = 4    # min bin width/height (pixels)
+
+    # precise binning: edges/faces go only into the cells they overlap, not their whole bounding box
+    bin_precise = False
+
     class SimpleVert:
         def __init__(self, co):
             self.co = co
@@ -938,78 +951,194 @@ class Accel2D:
             return self.p0 + self.d01 * mid(d, 0, self.l)
 
     @staticmethod
-    def simple_verts(verts, Point_to_Point2D):
+    def simple_verts(verts, Point_to_Point2D, Points_to_Point2Ds=None, adaptive=None, precise=None):
         verts = [Accel2D.SimpleVert(v) for v in verts]
-        return Accel2D(verts, [], [], Point_to_Point2D)
+        return Accel2D(verts, [], [], Point_to_Point2D, Points_to_Point2Ds=Points_to_Point2Ds, adaptive=adaptive, precise=precise)
 
     @staticmethod
-    def simple_edges(edges, Point_to_Point2D):
+    def simple_edges(edges, Point_to_Point2D, Points_to_Point2Ds=None, adaptive=None, precise=None):
         edges = [Accel2D.SimpleEdge((Accel2D.SimpleVert(v0), Accel2D.SimpleVert(v1))) for (v0, v1) in edges]
         verts = [v for e in edges for v in e.verts]
-        return Accel2D(verts, edges, [], Point_to_Point2D)
+        return Accel2D(verts, edges, [], Point_to_Point2D, Points_to_Point2Ds=Points_to_Point2Ds, adaptive=adaptive, precise=precise)
 
     @profiler.profile
-    def __init__(self, verts, edges, faces, Point_to_Point2D):
+    def __init__(self, verts, edges, faces, Point_to_Point2D, Points_to_Point2Ds=None, adaptive=None, precise=None):
+        '''
+        Point_to_Point2D projects a single point into region space.
+        Points_to_Point2Ds (optional, ex: Drawing.Points_to_Point2Ds) projects an Nx3 array of
+        points in one pass, returning an Nx2 array with nan for points that are not visible.
+        When given, all verts are projected at once instead of one at a time.
+
+        adaptive (default: Accel2D.bin_adaptive) sizes the grid from the element count and the
+        projected extent on every rebuild instead of using the fixed bin_cols x bin_rows.
+
+        precise (default: Accel2D.bin_precise) inserts edges only into the cells they cross and
+        faces only into the cells they overlap, rather than every cell of their bounding box.
+        Long diagonal edges then cover O(k) cells instead of O(k^2).
+
+        Each kind of element has its own CSR-style bins, ex: the verts in cell c = j * bin_cols + i
+        are self.verts[k] for k in items[offsets[c]:offsets[c+1]], where (offsets, items) = self.vert_bins
+
+        Validity is tracked by bitmaps (vert_valid, edge_valid, face_valid) that are filled from
+        is_valid when built and refreshed by clean_invalid() or invalidate().  Queries check only
+        the bitmaps, so after deleting elements call invalidate() (or clean_invalid()) before
+        querying again.  nearest_face is the exception: it reads the verts of each candidate
+        face, which raises for a deleted face, so it also checks is_valid first.
+        '''
         self.verts = list(verts) if verts else []
         self.edges = list(edges) if edges else []
         self.faces = list(faces) if faces else []
         self.Point_to_Point2D = Point_to_Point2D
+        self.Points_to_Point2Ds = Points_to_Point2Ds
+        self.adaptive = self.bin_adaptive if adaptive is None else adaptive
+        self.precise = self.bin_precise if precise is None else precise
         self.vert_type = type(self.verts[0]) if self.verts else None
         self.edge_type = type(self.edges[0]) if self.edges else None
         self.face_type = type(self.faces[0]) if self.faces else None
-        self.bins = {}
-
-        self.v2Ds = [Point_to_Point2D(v.co) for v in verts]
-        self.map_v_v2D = {v: v2d for (v, v2d) in zip(verts, self.v2Ds)}
-        if self.v2Ds:
-            self.min = Point2D((
-                min(x - 0.001 for (x, _) in self.v2Ds),
-                min(y - 0.001 for (_, y) in self.v2Ds)
-            ))
-            self.max = Point2D((
-                max(x + 0.001 for (x, _) in self.v2Ds),
-                max(y + 0.001 for (_, y) in self.v2Ds)
-            ))
+        counters.incr('Accel2D build')
+
+        # topology does not depend on the view, so gather it once into index arrays
+        pr = profiler.start('gathering arrays')
+        nv, ne, nf = len(self.verts), len(self.edges), len(self.faces)
+        self.map_v_i = {v: i for (i, v) in enumerate(self.verts)}
+        map_v_i = self.map_v_i
+        self.cos = np.fromiter(
+            chain.from_iterable(v.co for v in self.verts),
+            dtype=np.float64, count=nv * 3
+        ).reshape((nv, 3))
+        self.edge_vis = np.fromiter(
+            (map_v_i[v] for e in self.edges for v in e.verts),
+            dtype=np.int64, count=ne * 2
+        ).reshape((ne, 2))
+        self.face_lens = np.fromiter((len(f.verts) for f in self.faces), dtype=np.int64, count=nf)
+        self.face_vis = np.fromiter(
+            (map_v_i[v] for f in self.faces for v in f.verts),
+            dtype=np.int64, count=int(self.face_lens.sum())
+        )
+        self.face_starts = np.cumsum(self.face_lens) - self.face_lens
+        self.map_e_i = None
+        self.map_f_i = None
+        pr.done()
+
+        self.update_valid()
+        self.rebuild()
+
+    @profiler.profile
+    def rebuild(self):
+        ''' reprojects all verts and rebins all elements (ex: after the view changes) '''
+        nv, ne, nf = len(self.verts), len(self.edges), len(self.faces)
+        counters.incr('Accel2D rebuild')
+        counters.gauge('Accel2D elements', nv + ne + nf)
+
+        pr = profiler.start('projecting verts')
+        if self.Points_to_Point2Ds:
+            v2Ds = np.asarray(self.Points_to_Point2Ds(self.cos), dtype=np.float64).reshape((nv, 2))
+        else:
+            nan = float('nan')
+            Point_to_Point2D = self.Point_to_Point2D
+            p2ds = (Point_to_Point2D(v.co) for v in self.verts)
+            v2Ds = np.array(
+                [(p[0], p[1]) if p is not None else (nan, nan) for p in p2ds],
+                dtype=np.float64
+            ).reshape((nv, 2))
+        self.v2Ds = v2Ds
+        visible = ~np.isnan(v2Ds).any(axis=1)
+        self.vert_visible = visible
+        pr.done()
+
+        if visible.any():
+            v2Ds_visible = v2Ds[visible]
+            self.min = Point2D(tuple(v2Ds_visible.min(axis=0) - 0.001))
+            self.max = Point2D(tuple(v2Ds_visible.max(axis=0) + 0.001))
         else:
             self.min = Point2D((0, 0))
             self.max = Point2D((1, 1))
         self.size = self.max - self.min
 
+        if self.adaptive:
+            self.bin_cols, self.bin_rows = self.compute_bin_counts(int(visible.sum()) + ne + nf)
+
+        pr = profiler.start('computing bin indices')
+        cols, rows = self.bin_cols, self.bin_rows
+        gij = (v2Ds - (self.min.x, self.min.y)) * (cols / self.size.x, rows / self.size.y)
+        gij[~visible] = 0
+        gx, gy = gij[:, 0], gij[:, 1]
+        bi = np.clip(gx.astype(np.int64), 0, cols - 1)
+        bj = np.clip(gy.astype(np.int64), 0, rows - 1)
+        pr.done()
+
+        nbins = cols * rows
+
         pr = profiler.start('inserting verts')
-        for (v, v2d) in zip(verts, self.v2Ds):
-            i, j = self.compute_ij(v2d)
-            self._put(i, j, v)
+        vert_owners = np.flatnonzero(visible)
+        vert_cells = bj[vert_owners] * cols + bi[vert_owners]
+        self.vert_bins = bins_from_cells(vert_owners, vert_cells, nbins)
         pr.done()
 
         pr = profiler.start('inserting edges')
-        for e in edges:
-            v0, v1 = self.map_v_v2D[e.verts[0]], self.map_v_v2D[e.verts[1]]
-            ij0, ij1 = self.compute_ij(v0), self.compute_ij(v1)
-            mini, minj = min(ij0[0], ij1[0]), min(ij0[1], ij1[1])
-            maxi, maxj = max(ij0[0], ij1[0]), max(ij0[1], ij1[1])
-            for i in range(mini, maxi + 1):
-                for j in range(minj, maxj + 1):
-                    self._put(i, j, e)
-            # v0,v1 = e.verts
-            # self._put_edge(e, self.map_v_v2D[v0], self.map_v_v2D[v1])
+        ev = self.edge_vis
+        edge_owners = np.flatnonzero(visible[ev].all(axis=1))
+        a, b = ev[edge_owners, 0], ev[edge_owners, 1]
+        if self.precise:
+            runs, i0, j0, j1 = segment_column_runs(gx[a], gy[a], gx[b], gy[b], cols, rows)
+            edge_owners = edge_owners[runs]
+            i1 = i0
+        else:
+            i0, i1 = np.minimum(bi[a], bi[b]), np.maximum(bi[a], bi[b])
+            j0, j1 = np.minimum(bj[a], bj[b]), np.maximum(bj[a], bj[b])
+        owners, edge_cells = cells_in_rects(i0, j0, i1, j1, cols)
+        self.edge_bins = bins_from_cells(edge_owners[owners], edge_cells, nbins)
         pr.done()
 
         pr = profiler.start('inserting faces')
-        for f in faces:
-            v2ds = [self.map_v_v2D[v] for v in f.verts]
-            if not v2ds:
-                continue
-            ijs = list(map(self.compute_ij, v2ds))
-            mini, minj = min(i for (i, j) in ijs), min(j for (i, j) in ijs)
-            maxi, maxj = max(i for (i, j) in ijs), max(j for (i, j) in ijs)
-            for i in range(mini, maxi + 1):
-                for j in range(minj, maxj + 1):
-                    self._put(i, j, f)
-            # v0 = v2ds[0]
-            # for v1,v2 in zip(v2ds[1:-1],v2ds[2:]):
-            #    self._put_face(f, v0, v1, v2)
+        nonempty = np.flatnonzero(self.face_lens > 0)
+        if len(nonempty):
+            fv, starts = self.face_vis, self.face_starts[nonempty]
+            face_visible = np.logical_and.reduceat(visible[fv], starts)
+            face_owners = nonempty[face_visible]
+            if self.precise:
+                # each corner starts a boundary segment that ends at the next corner of its face.
+                # the fan diagonals from the first corner are added too, so that every triangle of
+                # the fan (as tested by nearest_face) is covered, even for concave faces
+                corner_face = np.repeat(np.arange(nf), self.face_lens)
+                corner_local = np.arange(len(fv)) - self.face_starts[corner_face]
+                corner_next = np.arange(1, len(fv) + 1)
+                corner_next[starts + self.face_lens[nonempty] - 1] = starts
+                face_is_visible = np.zeros(nf, dtype=bool)
+                face_is_visible[face_owners] = True
+                corners = np.flatnonzero(face_is_visible[corner_face])
+                diags = corners[(corner_local[corners] >= 2) & (corner_local[corners] <= self.face_lens[corner_face[corners]] - 2)]
+                a = np.concatenate((fv[corners], fv[self.face_starts[corner_face[diags]]]))
+                b = np.concatenate((fv[corner_next[corners]], fv[diags]))
+                owners = np.concatenate((corner_face[corners], corner_face[diags]))
+                face_owners, i0, j0, j1 = polygon_column_runs(owners, gx[a], gy[a], gx[b], gy[b], cols, rows)
+                i1 = i0
+            else:
+                i0 = np.minimum.reduceat(bi[fv], starts)[face_visible]
+                i1 = np.maximum.reduceat(bi[fv], starts)[face_visible]
+                j0 = np.minimum.reduceat(bj[fv], starts)[face_visible]
+                j1 = np.maximum.reduceat(bj[fv], starts)[face_visible]
+            owners, face_cells = cells_in_rects(i0, j0, i1, j1, cols)
+            face_owners = face_owners[owners]
+        else:
+            face_owners = np.zeros(0, dtype=np.int64)
+            face_cells = np.zeros(0, dtype=np.int64)
+        self.face_bins = bins_from_cells(face_owners, face_cells, nbins)
         pr.done()
 
+    def compute_bin_counts(self, count):
+        '''
+        returns (cols, rows) so that bins are about as square as the projected extent allows and
+        hold about bin_density elements each, bounded by bin_max and bin_min_size
+        '''
+        sx, sy = self.size
+        cells = max(1.0, count / self.bin_density)
+        cols = sqrt(cells * sx / sy)
+        rows = cells / cols
+        max_cols = max(1, int(min(self.bin_max, sx / self.bin_min_size)))
+        max_rows = max(1, int(min(self.bin_max, sy / self.bin_min_size)))
+        return (clamp(int(round(cols)), 1, max_cols), clamp(int(round(rows)), 1, max_rows))
+
     @profiler.profile
     def compute_ij(self, v2d):
         n = v2d - self.min
@@ -1019,121 +1148,153 @@ class Accel2D:
         j = max(0, min(self.bin_rows - 1, j))
         return (i, j)
 
-    def _put(self, i, j, o):
-        t = (i, j)
-        if t not in self.bins: self.bins[t] = set()
-        self.bins[t].add(o)
+    def _get_items(self, bins, valid, i0, j0, i1, j1):
+        # cells within a row are contiguous, so each row of the query is a single slice
+        offsets, items = bins
+        cols = self.bin_cols
+        rows = [
+            items[offsets[j * cols + i0]:offsets[j * cols + i1 + 1]]
+            for j in range(j0, j1 + 1)
+        ]
+        items = rows[0] if len(rows) == 1 else np.concatenate(rows)
+        items = items[valid[items]]
+        if i0 == i1 and j0 == j1:
+            return items
+        return np.unique(items)
 
-    def _get(self, i, j):
-        t = (i, j)
-        return self.bins.get(t, set())
+    def _get_kind(self, kind, i0, j0, i1, j1):
+        # kind is 'vert', 'edge', or 'face'.  items are already unique and valid (see _get_items),
+        # so the set is only built for the return value
+        elems = getattr(self, kind + 's')
+        items = self._get_items(getattr(self, kind + '_bins'), getattr(self, kind + '_valid'), i0, j0, i1, j1)
+        return set(map(elems.__getitem__, items.tolist()))
 
-    @profiler.profile
-    def clean_invalid(self):
-        self.bins = {
-            t: {o for o in objs if o.is_valid}
-            for (t, objs) in self.bins.items()
-        }
+    def _get(self, i, j):
+        if i < 0 or j < 0 or i >= self.bin_cols or j >= self.bin_rows:
+            return set()
+        return (
+            self._get_kind('vert', i, j, i, j) |
+            self._get_kind('edge', i, j, i, j) |
+            self._get_kind('face', i, j, i, j)
+        )
 
-    def _put_edge(self, e, v0, v1, depth=0):
-        i0, j0 = self.compute_ij(v0)
-        i1, j1 = self.compute_ij(v1)
-        if i0 == i1 and j0 == j1:
-            self._put(i0, j0, e)
-        elif i0 == i1:
-            i = i0
-            for j in range(min(j0, j1), max(j0, j1) + 1):
-                self._put(i, j, e)
-        elif j0 == j1:
-            j = j0
-            for i in range(min(i0, i1), max(i0, i1) + 1):
-                self._put(i, j, e)
-        elif depth == 6:
-            self._put(i0, j0, e)
-            self._put(i1, j1, e)
-        else:
-            vm = v0 + (v1 - v0) / 2
-            self._put_edge(e, v0, vm, depth=depth + 1)
-            self._put_edge(e, vm, v1, depth=depth + 1)
-
-    def _put_face(self, f, v0, v1, v2, depth=0):
-        i0, j0 = self.compute_ij(v0)
-        i1, j1 = self.compute_ij(v1)
-        i2, j2 = self.compute_ij(v2)
-        if i0 == i1 and i0 == i2 and j0 == j1 and j0 == j2:
-            self._put(i0, j0, f)
-        elif i0 == i1 and j0 == j1:
-            self._put_edge(f, v0, v2, depth=depth)
-        elif i0 == i2 and j0 == j2:
-            self._put_edge(f, v0, v1, depth=depth)
-        elif i1 == i2 and j1 == j2:
-            self._put_edge(f, v1, v2, depth=depth)
-        elif depth == 6:
-            self._put(i0, j0, f)
-            self._put(i1, j1, f)
-            self._put(i2, j2, f)
-        else:
-            v01 = v0 + (v1 - v0) / 2
-            v12 = v1 + (v2 - v1) / 2
-            v20 = v2 + (v0 - v2) / 2
-            self._put_face(f, v0, v01, v20, depth=depth + 1)
-            self._put_face(f, v1, v12, v01, depth=depth + 1)
-            self._put_face(f, v2, v20, v12, depth=depth + 1)
+    def update_valid(self):
+        ''' refreshes the validity bitmaps from is_valid '''
+        valid = lambda l: np.fromiter((o.is_valid for o in l), dtype=bool, count=len(l))
+        self.vert_valid = valid(self.verts)
+        self.edge_valid = valid(self.edges)
+        self.face_valid = valid(self.faces)
+
+    def invalidate(self, verts=None, edges=None, faces=None):
+        ''' marks the given elements as invalid without touching the rest '''
+        if verts:
+            self.vert_valid[[self.map_v_i[v] for v in verts]] = False
+        if edges:
+            if self.map_e_i is None: self.map_e_i = {e: i for (i, e) in enumerate(self.edges)}
+            self.edge_valid[[self.map_e_i[e] for e in edges]] = False
+        if faces:
+            if self.map_f_i is None: self.map_f_i = {f: i for (i, f) in enumerate(self.faces)}
+            self.face_valid[[self.map_f_i[f] for f in faces]] = False
 
     @profiler.profile
-    def get(self, v2d, within):
+    def clean_invalid(self):
+        self.update_valid()
+        for (attr, valid) in [('vert_bins', self.vert_valid), ('edge_bins', self.edge_valid), ('face_bins', self.face_valid)]:
+            offsets, items = getattr(self, attr)
+            keep = valid[items]
+            nbins = len(offsets) - 1
+            cells = np.repeat(np.arange(nbins), np.diff(offsets))
+            counts = np.bincount(cells[keep], minlength=nbins)
+            offsets = np.zeros(nbins + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            setattr(self, attr, (offsets, items[keep]))
+
+    def _get_range(self, v2d, within):
         delta = Vec2D((within, within))
         i0, j0 = self.compute_ij(v2d - delta)
         i1, j1 = self.compute_ij(v2d + delta)
-        l = set()
-        for i in range(i0, i1 + 1):
-            for j in range(j0, j1 + 1):
-                l |= self._get(i, j)
-        return {v for v in l if v.is_valid}
+        return (i0, j0, i1, j1)
+
+    @profiler.profile
+    def get(self, v2d, within):
+        r = self._get_range(v2d, within)
+        return self._get_kind('vert', *r) | self._get_kind('edge', *r) | self._get_kind('face', *r)
 
     @profiler.profile
     def get_verts(self, v2d, within):
-        vert_type = self.vert_type
-        return {g for g in self.get(v2d, within) if type(g) is vert_type}
+        return self._get_kind('vert', *self._get_range(v2d, within))
 
     @profiler.profile
     def get_edges(self, v2d, within):
-        edge_type = self.edge_type
-        return {g for g in self.get(v2d, within) if type(g) is edge_type}
+        return self._get_kind('edge', *self._get_range(v2d, within))
 
     @profiler.profile
     def get_faces(self, v2d, within):
-        face_type = self.face_type
-        return {g for g in self.get(v2d, within) if type(g) is face_type}
+        return self._get_kind('face', *self._get_range(v2d, within))
+
+    def _nearest_vert_indices(self, v2d, count, max_dist=None):
+        '''
+        searches bins ring by ring outward from the bin under v2d, stopping once no vert in the
+        next ring can be closer than the current count-th best (or max_dist)
+        returns (indices, distances) of up to count verts, sorted by distance
+        '''
+        offsets, items = self.vert_bins
+        valid, v2Ds = self.vert_valid, self.v2Ds
+        cols, rows = self.bin_cols, self.bin_rows
+        mx, my = self.min
+        cw, ch = self.size.x / cols, self.size.y / rows
+        x, y = v2d
+        ci, cj = self.compute_ij(v2d)
+        best_i, best_d = np.zeros(0, dtype=np.int64), np.zeros(0)
+        for r in range(max(ci, cols - 1 - ci, cj, rows - 1 - cj) + 1):
+            if r:
+                # verts in ring r lie outside the block of bins covered by rings 0..r-1
+                bound = min(
+                    x - (mx + cw * (ci - r + 1)), (mx + cw * (ci + r)) - x,
+                    y - (my + ch * (cj - r + 1)), (my + ch * (cj + r)) - y,
+                )
+                if len(best_d) == count and bound > best_d[-1]: break
+                if max_dist is not None and bound > max_dist: break
+            i0, i1 = max(ci - r, 0), min(ci + r, cols - 1)
+            cells = [
+                (j * cols + i0, j * cols + i1 + 1)
+                for j in ({cj - r, cj + r} if r else {cj})
+                if 0 <= j < rows
+            ]
+            if r:
+                cells += [
+                    (j * cols + i, j * cols + i + 1)
+                    for j in range(max(cj - r + 1, 0), min(cj + r - 1, rows - 1) + 1)
+                    for i in (ci - r, ci + r)
+                    if 0 <= i < cols
+                ]
+            slices = [items[offsets[c0]:offsets[c1]] for (c0, c1) in cells]
+            candidates = np.concatenate(slices) if slices else best_i[:0]
+            candidates = candidates[valid[candidates]]
+            if not len(candidates): continue
+            d = np.hypot(v2Ds[candidates, 0] - x, v2Ds[candidates, 1] - y)
+            if max_dist is not None:
+                candidates, d = candidates[d <= max_dist], d[d <= max_dist]
+            best_i, best_d = np.concatenate((best_i, candidates)), np.concatenate((best_d, d))
+            order = np.argsort(best_d, kind='mergesort')[:count]
+            best_i, best_d = best_i[order], best_d[order]
+        return (best_i, best_d)
 
     def nearest_vert(self, v2d):
-        Point_to_Point2D = self.Point_to_Point2D
-        vert_type = self.vert_type
-        x,y = v2d
-        i, j = self.compute_ij(v2d)
-        working = {(i,j)}
-        touched = set()
-        bv,bd = None,0
-        while working:
-            binij = working.pop()
-            if binij in touched: continue
-            touched.add(binij)
-            i,j = binij
-            if i < 0 or j < 0 or i >= self.bin_cols or j >= self.bin_rows: continue
-            mx,my = self.min + Vec2D((self.size.x * i / self.bin_cols, self.size.y * j / self.bin_rows))
-            Mx,My = self.min + Vec2D((self.size.x * (i+1) / self.bin_cols, self.size.y * (j+1) / self.bin_rows))
-            closest = Point2D((mid(x, mx, Mx), mid(y, my, My)))
-            d = (v2d - closest).length
-            if bv and d > bd:
-                # we have seen a vert that is closer than anything in this bin
-                continue
-            for v in self._get(i, j):
-                if type(v) is not vert_type: continue
-                d = (Point_to_Point2D(v.co) - v2d).length
-                if bv and d > bd: continue
-                bv,bd = v,d
-            working |= {(i-1,j-1), (i,j-1), (i+1,j-1), (i-1,j), (i+1,j), (i-1,j+1), (i,j+1), (i+1,j+1)}
-        return Point_to_Point2D(bv.co)
+        ''' returns projected position of vert nearest to v2d (None if there are no verts) '''
+        indices, _ = self._nearest_vert_indices(v2d, 1)
+        if not len(indices): return None
+        return Point2D(tuple(self.v2Ds[indices[0]]))
+
+    def nearest_verts(self, v2d, count, max_dist=None):
+        '''
+        returns list of (vert, distance) for the count verts nearest to v2d, closest first.
+        invalid verts (see vert_valid) are dropped before picking the nearest, so fewer than count
+        are returned only when fewer valid verts are within max_dist
+        '''
+        indices, dists = self._nearest_vert_indices(v2d, count, max_dist=max_dist)
+        verts = self.verts
+        return [(verts[i], d) for (i, d) in zip(indices.tolist(), dists.tolist())]
 
     @profiler.profile
     def nearest_face(self, v2d):
@@ -1152,12 +1313,11 @@ class Accel2D:
             return False
 
         Point_to_Point2D = self.Point_to_Point2D
-        face_type = self.face_type
         i, j = self.compute_ij(v2d)
-        faces = [bmf for bmf in self._get(i, j) if type(bmf) is face_type]
-        for bmf in faces:
-            if not bmf.is_valid:
-                continue
+        faces = self.faces
+        for k in self._get_items(self.face_bins, self.face_valid, i, j, i, j).tolist():
+            bmf = faces[k]
+            if not bmf.is_valid: continue
             if intersect_face(bmf):
                 return bmf
         return None
@@ -1204,7 +1364,7 @@ def space_evenly_on_path(verts:list, segments:int, cyclic:bool=False, shift:floa
                   e.g., a shift of 0.5 with 8 segments will shift the verts 1/16th of the loop length
 
     return
-        new_verts: list of new Vert Locations type list[Mathutils.Vector]
+        new_verts: list of new Vert Locations, of same type as verts[0] (ex: Vector or Point)
     '''
 
     if len(verts) < 2:
@@ -1216,84 +1376,34 @@ def space_evenly_on_path(verts:list, segments:int, cyclic:bool=False, shift:floa
         print('Not shifting because this is not a cyclic vert chain')
         shift = 0
 
-    # calc_length
-    arch_len = 0
-    cumulative_lengths = [0] # TODO: make this the right size and dont append
-    for i in range(0, len(verts)-1):
-        v0 = verts[i]
-        v1 = verts[i+1]
-        V = v1 - v0
-        arch_len += V.length
-        cumulative_lengths.append(arch_len)
+    # cumulative length at each vert (and back at first vert, if cyclic)
+    co = np.array([tuple(v) for v in verts], dtype=np.float64)
+    if cyclic: co = np.concatenate([co, co[:1]])
+    cumulative_lengths = np.concatenate([[0.0], np.cumsum(np.sqrt(np.sum(np.diff(co, axis=0)**2, axis=1)))])
+    arch_len = cumulative_lengths[-1]
 
+    # desired length along path of each new vert (wrapping around, if cyclic and shifted).
+    # if not cyclic, end points are sealed to the first and last verts
     if cyclic:
-        v0 = verts[-1]
-        v1 = verts[0]
-        V = v1 - v0
-        arch_len += V.length
-        cumulative_lengths.append(arch_len)
-        # print(cumulative_lengths)
-
-    # identify vert indicies of import
-    # this will be the largest vert which lies at
-    # no further than the desired fraction of the curve
-
-    # initialze new vert array and seal the end points
-    if cyclic:
-        new_verts = [[None]] * segments
-        # new_verts[0] = verts[0]
+        desired_lengths = np.arange(segments) / segments * arch_len + shift * arch_len / segments
+        desired_lengths = np.where(desired_lengths > arch_len, desired_lengths - arch_len, desired_lengths)
+        desired_lengths = np.where(desired_lengths < 0, arch_len + desired_lengths, desired_lengths)
     else:
-        new_verts = [[None]] * (segments + 1)
-        new_verts[0]  = verts[0]
-        new_verts[-1] = verts[-1]
-
-
-    n = 0 # index to save some looping through the cumulative lengths list
-          # now we are leaving it 0 becase we may end up needing the beginning of the loop last
-          # and if we are subdividing, we may hit the same cumulative lenght several times.
-          # for now, use the slow and generic way, later developsomething smarter.
-    for i in range(0,segments- 1 + cyclic * 1):
-        desired_length_raw = (i + 1 + cyclic * -1)/segments * arch_len + shift * arch_len / segments
-        # print('the length we desire for the %i segment is %f compared to the total length which is %f' % (i, desired_length_raw, arch_len))
-        # like a mod function, but for non integers?
-        if desired_length_raw > arch_len:
-            desired_length = desired_length_raw - arch_len
-        elif desired_length_raw < 0:
-            desired_length = arch_len + desired_length_raw #this is the end, + a negative number
-        else:
-            desired_length = desired_length_raw
-
-        # find the original vert with the largets legnth
-        # not greater than the desired length
-        # I used to set n = J after each iteration
-        for j in range(n, len(verts)+1):
-
-            if cumulative_lengths[j] > desired_length:
-                # print('found a greater length at vert %i' % j)
-                # this was supposed to save us some iterations so that
-                # we don't have to start at the beginning each time....
-                # if j >= 1:
-                #     n = j - 1 #going one back allows us to space multiple verts on one edge
-                # else:
-                #     n = 0
-                break
-
-        extra = desired_length - cumulative_lengths[j-1]
-        if j == len(verts):
-            new_verts[i + 1 + cyclic * -1] = verts[j-1] + extra * (verts[0]-verts[j-1]).normalized()
-        else:
-            new_verts[i + 1 + cyclic * -1] = verts[j-1] + extra * (verts[j]-verts[j-1]).normalized()
-
-    # eds = []
-    # for i in range(0,len(new_verts)-1):
-    #     eds.append((i, i+1))
-    # if cyclic:
-    #     # close the loop
-    #     eds.append((i+1, 0))
+        desired_lengths = np.arange(1, segments) / segments * arch_len
+
+    # interpolate each axis of verts at desired lengths
+    new_co = np.stack([
+        np.interp(desired_lengths, cumulative_lengths, co[:, axis])
+        for axis in range(co.shape[1])
+    ], axis=1)
+    cls = type(verts[0])
+    new_verts = [cls(tuple(v)) for v in new_co]
+    if not cyclic:
+        new_verts = [verts[0]] + new_verts + [verts[-1]]
+
     if debug:
         print(cumulative_lengths)
         print(arch_len)
-        # print(eds)
 
     return new_verts
 
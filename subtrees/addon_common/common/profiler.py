@@ -20,24 +20,89 @@ Created by Jonathan Denning, Jonathan Williamson, and Patrick Moore
 '''
 
 import os
-import inspect
+import sys
+import json
 import time
+import inspect
+import threading
+from array import array
 
 from .globals import set_global, get_global
 
+
+def swap_wrappers(registry, enabled):
+    '''
+    installs wrappers (enabled) or original functions (disabled) wherever they are defined or
+    imported by name, so a disabled decorator costs nothing.  registry is a list of
+    (module name, qualname, fn, wrapper).  nested functions are not registered; they always get
+    their wrapper, which must check whether it is enabled.
+    '''
+    swaps = {}
+    packages = set()
+    for modname,qualname,fn,wrapper in registry:
+        old,new = (fn,wrapper) if enabled else (wrapper,fn)
+        swaps[id(old)] = (old, new)
+        packages.add(modname.split('.')[0])
+        parts = qualname.split('.')
+        owner = sys.modules.get(modname, None)
+        for part in parts[:-1]:
+            owner = getattr(owner, part, None)
+        if owner is None: continue
+        name = parts[-1]
+        try:
+            cur = inspect.getattr_static(owner, name)
+        except AttributeError:
+            continue
+        if cur is old:
+            setattr(owner, name, new)
+        elif type(cur) in {staticmethod, classmethod} and cur.__func__ is old:
+            setattr(owner, name, type(cur)(new))
+
+    # module-level names imported with `from x import fn`
+    for modname,module in list(sys.modules.items()):
+        if modname.split('.')[0] not in packages: continue
+        d = getattr(module, '__dict__', None)
+        if not d: continue
+        for name,val in list(d.items()):
+            old_new = swaps.get(id(val), None)
+            if old_new and old_new[0] is val: d[name] = old_new[1]
+
+
 class Profiler:
     _enabled = False
     _filename = 'Profiler'
     _broken = False
+    _registry = []      # (module name, qualname, fn, wrapper) for each fn decorated with profile
 
     @staticmethod
     def set_profiler_enabled(v):
+        '''
+        enables or disables profiling.  while disabled, functions decorated with profile run
+        unwrapped, and enabling swaps the profile wrapper back in where each function is defined
+        and wherever it was imported by name (`from x import fn`) within the same package.
+        limitation: a profiled function that was wrapped again by another decorator (ex:
+        stats_wrapper) is held inside that wrapper and cannot be swapped, so it is not profiled
+        unless the profiler was already enabled when it was decorated.
+        '''
+        v = bool(v)
+        if Profiler._enabled == v: return
         Profiler._enabled = v
+        swap_wrappers(Profiler._registry, v)
 
     @staticmethod
     def get_profiler_enabled():
         return Profiler._enabled
 
+    @staticmethod
+    def set_profiler_sampling(v, interval=None):
+        # statistical alternative to instrumenting, cheap enough for production sessions
+        if v: sampling_profiler.start(interval=interval)
+        else: sampling_profiler.stop()
+
+    @staticmethod
+    def get_profiler_sampling():
+        return sampling_profiler.is_running()
+
     @staticmethod
     def set_profiler_filename(path):
         Profiler._filename = path
@@ -62,6 +127,7 @@ class Profiler:
             self._is_done = False
             self.pr.d_start[self.full_text] = time.time()
             self.pr.stack.append(self)
+            if trace_recorder.recording: trace_recorder.begin(text)
 
         def __del__(self):
             if Profiler._broken:
@@ -94,6 +160,7 @@ class Profiler:
             assert not self._is_done
             self.pr.stack.pop()
             self._is_done = True
+            if trace_recorder.recording: trace_recorder.end(self.text)
             st = self.pr.d_start[self.full_text]
             en = time.time()
             delta = en-st
@@ -186,36 +253,50 @@ class Profiler:
                 get_global('debugger').print_exception()
                 raise e
         wrapper.__name__ = fn.__name__
+        wrapper.__qualname__ = fn.__qualname__
+        wrapper.__module__ = fn.__module__
         wrapper.__doc__ = fn.__doc__
-        return wrapper
+
+        # nested functions are decorated again on every call of outer function and cannot be
+        # swapped later, so they always get wrapper and are not registered (registering would
+        # keep each closure alive)
+        if '<locals>' in fn.__qualname__: return wrapper
+        # return fn directly while disabled; set_profiler_enabled swaps wrapper in when enabled
+        Profiler._registry.append((fn.__module__, fn.__qualname__, fn, wrapper))
+        return wrapper if Profiler._enabled else fn
 
     def strout(self):
         if not Profiler._enabled:
             return ''
+        return self.format_report('Profiler:', self.clear_time, self.d_times, self.d_count, self.d_times_sub, self.d_mins, self.d_maxs, self.d_last)
+
+    @staticmethod
+    def format_report(title, clear_time, d_times, d_count, d_times_sub, d_mins, d_maxs, d_last):
+        '''
+        d_mins, d_maxs, and d_last can be None (ex: sampled reports), and are printed as "-"
+        '''
+        def col(d, text): return '%6.4f' % d[text] if d is not None else '     -'
         s = [
-            'Profiler:',
-            '  run: %6.2fsecs' % (time.time() - self.clear_time),
+            title,
+            '  run: %6.2fsecs' % (time.time() - clear_time),
             '----------------------------------------------------------------------------------------------',
             '   total      call   ------- seconds / call -------             delta                         ',
             '    secs /   count =   last,    min,    avg,    max  (  fps) -  time  - call stack            ',
             '----------------------------------------------------------------------------------------------',
         ]
-        for text in sorted(self.d_times):
-            tottime = self.d_times[text]
-            totcount = self.d_count[text]
-            deltime = self.d_times[text] - self.d_times_sub.get(text, 0)
+        for text in sorted(d_times):
+            tottime = d_times[text]
+            totcount = d_count[text]
+            deltime = d_times[text] - d_times_sub.get(text, 0)
             avgt = tottime / totcount
-            mint = self.d_mins[text]
-            maxt = self.d_maxs[text]
-            last = self.d_last[text]
             calls = text.split('^')
             t = text if len(calls) == 1 else (
                 ' |  '*(len(calls)-2) + ' \\- ' + calls[-1])
             fps = totcount / tottime if tottime > 0 else 1000
             fps = ' 1k+ ' if fps >= 1000 else '%5.1f' % fps
-            s += ['  %6.2f / %7d = %6.4f, %6.4f, %6.4f, %6.4f, (%s) - %6.2f - %s' % (
-                tottime, totcount, last, mint, avgt, maxt, fps, deltime, t)]
-        s += ['run: %6.2fsecs' % (time.time() - self.clear_time)]
+            s += ['  %6.2f / %7d = %s, %s, %6.4f, %s, (%s) - %6.2f - %s' % (
+                tottime, totcount, col(d_last, text), col(d_mins, text), avgt, col(d_maxs, text), fps, deltime, t)]
+        s += ['run: %6.2fsecs' % (time.time() - clear_time)]
         return '\n'.join(s)
 
     def printout(self):
@@ -234,10 +315,288 @@ class Profiler:
             return
         self.last_profile_out = time.time()
 
+        open(self.get_filepath(), 'wt').write(self.strout())
+
+    @staticmethod
+    def get_filepath(suffix=''):
         # .. back to retopoflow root
         path = os.path.dirname(os.path.abspath(__file__))
-        filename = os.path.join(path, '..', Profiler._filename)
-        open(filename, 'wt').write(self.strout())
+        return os.path.join(path, '..', Profiler._filename + suffix)
 
 profiler = Profiler()
 set_global(profiler)
+
+
+class SamplingProfiler:
+    '''
+    statistical profiler: a background thread periodically samples the call stack of the profiled
+    (main) thread with sys._current_frames().  each sample counts as the time since the previous
+    one, so the report (same format as Profiler.strout) gives estimated times.  counts are number
+    of samples, not calls.  only time spent running python code is seen.
+    '''
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.d_times = {}
+            self.d_times_sub = {}
+            self.d_count = {}
+            self.samples = 0
+            self.last_profile_out = 0
+            self.clear_time = time.time()
+            self.code_text = {}
+
+    def is_running(self):
+        return self.running
+
+    def start(self, thread_id=None, interval=None):
+        if self.running: return
+        if interval: self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='SamplingProfiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running: return
+        self.running = False
+        self.thread.join()
+        self.thread = None
+
+    def _get_text(self, code):
+        # cache formatted text per code object, as it is needed for every frame of every sample.
+        # must be called with self.lock held (clear replaces code_text)
+        text = self.code_text.get(code, None)
+        if text is None:
+            filename = os.path.basename(code.co_filename)
+            fnname = code.co_name
+            space = ' '*(30-len(fnname))
+            text = '%s%s (%s:%d)' % (fnname, space, filename, code.co_firstlineno)
+            self.code_text[code] = text
+        return text
+
+    def _run(self):
+        this_file = __file__
+        prev = time.perf_counter()
+        while self.running:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            delta, prev = now - prev, now
+            frame = sys._current_frames().get(self.thread_id, None)
+            if frame is None: continue
+            codes = []
+            while frame:
+                code = frame.f_code
+                if code.co_filename != this_file:
+                    codes.append(code)
+                frame = frame.f_back
+            if not codes: continue
+            codes.reverse()
+            with self.lock:
+                self._add_sample([self._get_text(code) for code in codes], delta)
+
+    def _add_sample(self, texts, delta):
+        def update(key, key_parent):
+            self.d_count[key] = self.d_count.get(key, 0) + 1
+            self.d_times[key] = self.d_times.get(key, 0) + delta
+            if key_parent:
+                self.d_times_sub[key_parent] = self.d_times_sub.get(key_parent, 0) + delta
+        self.samples += 1
+        update('~~ All Calls ~~', None)
+        key_parent = None
+        for text in texts:
+            key = key_parent + '^' + text if key_parent else text
+            update(key, key_parent)
+            key_parent = key
+        # recursive functions count once per sample
+        for text in set(texts):
+            update('~~ All Calls ~~^%s' % text, None)
+
+    def strout(self):
+        with self.lock:
+            d_times = dict(self.d_times)
+            d_count = dict(self.d_count)
+            d_times_sub = dict(self.d_times_sub)
+            samples = self.samples
+        if not d_times: return ''
+        title = 'Sampling Profiler: %d samples, every %0.1fms' % (samples, self.interval * 1000)
+        return Profiler.format_report(title, self.clear_time, d_times, d_count, d_times_sub, None, None, None)
+
+    def printout(self):
+        print('%s\n\n\n' % self.strout())
+
+    def printfile(self, interval=0.25):
+        if time.time() < self.last_profile_out + interval:
+            return
+        self.last_profile_out = time.time()
+        open(Profiler.get_filepath(' (sampled)'), 'wt').write(self.strout())
+
+sampling_profiler = SamplingProfiler()
+
+
+
+class TraceRecorder:
+    '''
+    records begin/end events of profiled calls (see Profiler.start) into a preallocated ring
+    buffer, keeping the most recent capacity events.  export writes them as Chrome Trace Event
+    JSON (chrome://tracing, perfetto) or speedscope JSON from a background thread.
+    '''
+
+    def __init__(self, capacity=200000):
+        self.recording = False
+        self.lock = threading.Lock()        # profiled calls may come from more than one thread
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.names = [None] * capacity
+        self.phases = bytearray(capacity)       # ord('B') or ord('E')
+        self.times = array('d', [0.0]) * capacity
+        self.tids = array('q', [0]) * capacity
+        self.clear()
+
+    def clear(self):
+        self.next = 0           # index of next event to write
+        self.count = 0          # number of events held (<= capacity)
+        self.start_time = time.perf_counter()
+
+    def start(self, capacity=None):
+        if capacity and capacity != self.capacity: self.allocate(capacity)
+        else: self.clear()
+        self.recording = True
+
+    def stop(self):
+        self.recording = False
+
+    def _record(self, name, phase):
+        t = time.perf_counter()
+        tid = threading.get_ident()
+        with self.lock:
+            i = self.next
+            self.names[i] = name
+            self.phases[i] = phase
+            self.times[i] = t
+            self.tids[i] = tid
+            self.next = (i + 1) % self.capacity
+            if self.count < self.capacity: self.count += 1
+
+    def begin(self, name): self._record(name, 66)    # 'B'
+    def end(self, name): self._record(name, 69)      # 'E'
+
+    def copy_raw(self):
+        '''
+        returns copy of ring buffer, reordered oldest first.  only slices are copied, so this is
+        cheap enough to call on the main thread even when the ring is full
+        '''
+        with self.lock:
+            first = (self.next - self.count) % self.capacity
+            last = first + self.count
+            def ordered(a):
+                return a[first:last] if last <= self.capacity else a[first:] + a[:last - self.capacity]
+            return (ordered(self.names), ordered(self.phases), ordered(self.times), ordered(self.tids), self.start_time)
+
+    @staticmethod
+    def events_from_raw(raw):
+        '''
+        returns events of copy_raw as list of (name, phase, seconds since start, thread id)
+        '''
+        names, phases, times, tids, t0 = raw
+        return [(name, chr(phase), t - t0, tid) for (name, phase, t, tid) in zip(names, phases, times, tids)]
+
+    def snapshot(self):
+        '''
+        returns recorded events oldest first as list of (name, phase, seconds since start, thread id)
+        '''
+        return self.events_from_raw(self.copy_raw())
+
+    @staticmethod
+    def _balanced(events):
+        '''
+        drops ends whose begins were overwritten in ring buffer, and closes calls still open at end,
+        so each thread's events nest properly
+        '''
+        stacks, balanced = {}, []
+        last = events[-1][2] if events else 0
+        for name,phase,t,tid in events:
+            stack = stacks.setdefault(tid, [])
+            if phase == 'B':
+                stack.append(name)
+            elif stack and stack[-1] == name:
+                stack.pop()
+            else:
+                continue
+            balanced.append((name, phase, t, tid))
+        for tid,stack in stacks.items():
+            for name in reversed(stack):
+                balanced.append((name, 'E', last, tid))
+        return balanced
+
+    @staticmethod
+    def to_chrome(events):
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {'name': ' '.join(name.split()), 'ph': phase, 'ts': t * 1000000, 'pid': pid, 'tid': tid}
+                for (name,phase,t,tid) in events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    @staticmethod
+    def to_speedscope(events):
+        frames, frame_idx, profiles = [], {}, {}
+        for name,phase,t,tid in events:
+            name = ' '.join(name.split())
+            if name not in frame_idx:
+                frame_idx[name] = len(frames)
+                frames.append({'name': name})
+            profiles.setdefault(tid, []).append({'type': 'O' if phase == 'B' else 'C', 'frame': frame_idx[name], 'at': t * 1000})
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'evented',
+                    'name': 'thread %d' % tid,
+                    'unit': 'milliseconds',
+                    'startValue': evts[0]['at'],
+                    'endValue': evts[-1]['at'],
+                    'events': evts,
+                }
+                for (tid,evts) in profiles.items()
+            ],
+        }
+
+    def export(self, filename=None, format='chrome', wait=False):
+        '''
+        writes recorded events to filename (next to profiler file if None) as format 'chrome' or
+        'speedscope'.  only copying the ring buffer happens on calling thread; formatting,
+        converting, and writing happen on a background thread, which is returned (joined first
+        if wait is True)
+        '''
+        assert format in {'chrome', 'speedscope'}, 'Unknown trace format "%s"' % format
+        if not filename: filename = Profiler.get_filepath(' (trace %s).json' % format)
+        raw = self.copy_raw()
+        def write():
+            try:
+                balanced = self._balanced(self.events_from_raw(raw))
+                data = self.to_chrome(balanced) if format == 'chrome' else self.to_speedscope(balanced)
+                tmp = filename + '.tmp'
+                with open(tmp, 'wt') as f:
+                    json.dump(data, f)
+                os.replace(tmp, filename)
+            except Exception as e:
+                print('Caught exception while exporting trace to "%s"' % filename)
+                print(e)
+        thread = threading.Thread(target=write, name='TraceRecorder export', daemon=True)
+        thread.start()
+        if wait: thread.join()
+        return thread
+
+trace_recorder = TraceRecorder()
@@ -204,6 +204,8 @@ class Shader():
                 # cannot set bools with BGL! :(
                 if t == 'float':
                     bgl.glUniform1f(l, varValue)
+                elif t in {'int', 'sampler2D'}:
+                    bgl.glUniform1i(l, varValue)
                 elif t == 'vec2':
                     bgl.glUniform2f(l, *varValue)
                 elif t == 'vec3':
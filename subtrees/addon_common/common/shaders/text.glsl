@@ -0,0 +1,32 @@
+uniform mat4 uPixelMatrix;
+uniform sampler2D uAtlas;
+
+attribute vec2 vPos;
+attribute vec2 vUV;
+attribute vec4 vColor;
+
+varying vec2 aUV;
+varying vec4 aColor;
+
+
+/////////////////////////////////////////////////////////////////////////
+// vertex shader
+
+#version 120
+
+void main() {
+    gl_Position = uPixelMatrix * vec4(vPos, 0.0, 1.0);
+    aUV         = vUV;
+    aColor      = vColor;
+}
+
+
+/////////////////////////////////////////////////////////////////////////
+// fragment shader
+
+#version 120
+
+void main() {
+    // glyph coverage is stored in atlas alpha
+    gl_FragColor = vec4(aColor.rgb, aColor.a * texture2D(uAtlas, aUV).a);
+}
@@ -0,0 +1,281 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import math
+
+import bgl
+import gpu
+import numpy as np
+
+from .decorators import blender_version_wrapper
+from .drawing import Drawing
+from .fontmanager import FontManager as fm
+from .profiler import profiler
+from .shaders import Shader
+from ..ext.bgl_ext import np_array_as_bgl_Buffer
+
+
+textShader = Shader.load_from_file('textShader', 'text.glsl', checkErrors=False)
+
+
+@blender_version_wrapper('<', '2.80')
+def new_atlas_offscreen(width, height):
+    return gpu.offscreen.new(width, height)
+@blender_version_wrapper('>=', '2.80')
+def new_atlas_offscreen(width, height):
+    return gpu.types.GPUOffScreen(width, height)
+
+
+class GlyphAtlas:
+    '''
+    rasterizes the printable ascii glyphs of a font at one size into a texture (once), and keeps
+    the metrics needed to lay out strings from it.  see can_render for strings it cannot lay out.
+    '''
+    chars = ''.join(chr(c) for c in range(32, 127))
+    cols = 16
+    padding = 2
+
+    _atlases = {}
+
+    @staticmethod
+    def get(fontid, fontsize):
+        key = (fontid, fontsize)
+        if key not in GlyphAtlas._atlases:
+            GlyphAtlas._atlases[key] = GlyphAtlas(fontid, fontsize)
+        return GlyphAtlas._atlases[key]
+
+    @staticmethod
+    def free_all():
+        for atlas in GlyphAtlas._atlases.values():
+            atlas.free()
+        GlyphAtlas._atlases = {}
+
+    @profiler.profile
+    def __init__(self, fontid, fontsize):
+        self.fontid = fontid
+        self.fontsize = fontsize
+
+        fm.size(fontsize, 72, fontid=fontid)
+        self.advance = np.array([fm.dimensions(c, fontid=fontid)[0] for c in self.chars], dtype=np.float32)
+        height = fm.dimensions(self.chars, fontid=fontid)[1]
+        self.descent = math.ceil(fm.dimensions('Agjpqy', fontid=fontid)[1] - fm.dimensions('A', fontid=fontid)[1])
+
+        pad = self.padding
+        self.cell_width = math.ceil(self.advance.max()) + pad * 2
+        self.cell_height = math.ceil(height) + self.descent + pad * 2
+        rows = math.ceil(len(self.chars) / self.cols)
+        self.width = self.cols * self.cell_width
+        self.height = rows * self.cell_height
+
+        # lower-left corner of each glyph's cell
+        i = np.arange(len(self.chars))
+        self.cell_x = (i % self.cols) * self.cell_width
+        self.cell_y = (i // self.cols) * self.cell_height
+        self.uv0 = np.stack([self.cell_x / self.width, self.cell_y / self.height], axis=1).astype(np.float32)
+        self.uv_size = np.array([self.cell_width / self.width, self.cell_height / self.height], dtype=np.float32)
+
+        self.offscreen = None
+        self.rasterize()
+
+    def rasterize(self):
+        pad = self.padding
+        self.offscreen = new_atlas_offscreen(self.width, self.height)
+        self.offscreen.bind()
+        bgl.glPushAttrib(bgl.GL_COLOR_BUFFER_BIT | bgl.GL_ENABLE_BIT | bgl.GL_VIEWPORT_BIT | bgl.GL_SCISSOR_BIT)
+        bgl.glMatrixMode(bgl.GL_PROJECTION)
+        bgl.glPushMatrix()
+        bgl.glLoadIdentity()
+        bgl.glOrtho(0, self.width, 0, self.height, -1, 1)
+        bgl.glMatrixMode(bgl.GL_MODELVIEW)
+        bgl.glPushMatrix()
+        bgl.glLoadIdentity()
+        try:
+            bgl.glViewport(0, 0, self.width, self.height)
+            bgl.glDisable(bgl.GL_SCISSOR_TEST)
+            bgl.glClearColor(0, 0, 0, 0)
+            bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
+            bgl.glEnable(bgl.GL_BLEND)
+            # accumulate coverage into alpha
+            bgl.glBlendFuncSeparate(bgl.GL_SRC_ALPHA, bgl.GL_ONE_MINUS_SRC_ALPHA, bgl.GL_ONE, bgl.GL_ONE_MINUS_SRC_ALPHA)
+            bgl.glColor4f(1, 1, 1, 1)
+            fm.size(self.fontsize, 72, fontid=self.fontid)
+            for c,x,y in zip(self.chars, self.cell_x, self.cell_y):
+                if c == ' ': continue
+                fm.draw(c, xyz=(int(x) + pad, int(y) + pad + self.descent, 0), fontid=self.fontid)
+        finally:
+            bgl.glMatrixMode(bgl.GL_PROJECTION)
+            bgl.glPopMatrix()
+            bgl.glMatrixMode(bgl.GL_MODELVIEW)
+            bgl.glPopMatrix()
+            bgl.glPopAttrib()
+            self.offscreen.unbind()
+        self.texture = self.offscreen.color_texture
+
+    def free(self):
+        if self.offscreen: self.offscreen.free()
+        self.offscreen = None
+
+    def can_render(self, text):
+        return all(' ' <= c <= '~' for c in text)
+
+    def glyph_indices(self, text):
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64) - 32
+        return np.where((codes >= 0) & (codes < len(self.chars)), codes, 0)
+
+
+class TextBatchRender:
+    '''
+    collects strings, each with its own position and color, and draws all of them from a glyph
+    atlas with a single draw call.  positions are in region pixels at the text baseline, same as
+    blf.position.  fontsize of None uses the size most recently set through Drawing.set_font_size.
+    strings with characters the atlas does not hold are drawn with blf instead.
+    '''
+    # corners of the two triangles of each glyph quad
+    quad = np.array([(0,0), (1,0), (1,1), (0,0), (1,1), (0,1)], dtype=np.float32)
+
+    def __init__(self, fontsize=None, fontid=None):
+        self.drawing = Drawing.get_instance()
+        self.fontsize = fontsize
+        self.fontid = fontid
+        self.texts = []
+
+        self.vbos = bgl.Buffer(bgl.GL_INT, 3)
+        bgl.glGenBuffers(3, self.vbos)
+        self.vbo_pos = self.vbos[0]
+        self.vbo_uv = self.vbos[1]
+        self.vbo_color = self.vbos[2]
+
+    def __del__(self):
+        bgl.glDeleteBuffers(3, self.vbos)
+        del self.vbos
+
+    def clear(self):
+        self.texts = []
+
+    def add(self, text, pos, color=(1,1,1,1)):
+        text = str(text)
+        if not text: return
+        self.texts.append((text, pos, color))
+
+    def restore_font_size(self, fontid):
+        # atlas and fallback change blf size; put back size Drawing expects
+        if self.drawing.fontsize_scaled is None: return
+        fm.size(self.drawing.fontsize_scaled, 72, fontid=fontid)
+
+    def get_atlas(self):
+        fontsize = self.fontsize
+        if fontsize is None: fontsize = self.drawing.fontsize or 12
+        fontsize_scaled = int(int(fontsize) * self.drawing.get_dpi_mult())
+        fontid = fm.load(self.fontid)
+        created = (fontid, fontsize_scaled) not in GlyphAtlas._atlases
+        atlas = GlyphAtlas.get(fontid, fontsize_scaled)
+        if created: self.restore_font_size(fontid)
+        return atlas
+
+    def draw_fallback(self, atlas, texts):
+        # blf draws at the size it was last given, so match the atlas
+        fm.size(atlas.fontsize, 72, fontid=atlas.fontid)
+        bgl.glEnable(bgl.GL_BLEND)
+        for (text, pos, color) in texts:
+            bgl.glColor4f(*color)
+            fm.draw(text, xyz=(pos[0], pos[1], 0), fontid=atlas.fontid)
+        self.restore_font_size(atlas.fontid)
+
+    @profiler.profile
+    def build(self, atlas):
+        '''
+        returns positions, texture coords, and colors of glyph triangle verts for all strings
+        '''
+        counts = np.array([len(text) for (text,_,_) in self.texts])
+        glyphs = atlas.glyph_indices(''.join(text for (text,_,_) in self.texts))
+        origins = np.array([pos[:2] for (_,pos,_) in self.texts], dtype=np.float32)
+        colors = np.array([color for (_,_,color) in self.texts], dtype=np.float32)
+
+        # pen offset of each glyph from start of its string
+        advance = atlas.advance[glyphs]
+        pen = np.cumsum(advance) - advance
+        starts = np.cumsum(counts) - counts
+        pen -= np.repeat(pen[starts], counts)
+
+        pad = atlas.padding
+        x = np.repeat(origins[:, 0], counts) + pen - pad
+        y = np.repeat(origins[:, 1], counts) - pad - atlas.descent
+        rgba = np.repeat(colors, counts, axis=0)
+
+        # spaces (and unknown characters) have nothing to draw
+        keep = glyphs != 0
+        glyphs, x, y, rgba = glyphs[keep], x[keep], y[keep], rgba[keep]
+
+        size = np.array([atlas.cell_width, atlas.cell_height], dtype=np.float32)
+        pos = np.stack([x, y], axis=1)[:, None, :] + self.quad[None, :, :] * size
+        uv = atlas.uv0[glyphs][:, None, :] + self.quad[None, :, :] * atlas.uv_size
+        rgba = np.repeat(rgba[:, None, :], 6, axis=1)
+        return (
+            np.ascontiguousarray(pos.reshape((-1, 2)), dtype=np.float32),
+            np.ascontiguousarray(uv.reshape((-1, 2)), dtype=np.float32),
+            np.ascontiguousarray(rgba.reshape((-1, 4)), dtype=np.float32),
+        )
+
+    def _upload(self, vbo, array):
+        bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, vbo)
+        bgl.glBufferData(bgl.GL_ARRAY_BUFFER, array.nbytes, np_array_as_bgl_Buffer(array), bgl.GL_DYNAMIC_DRAW)
+        bgl.glBindBuffer(bgl.GL_ARRAY_BUFFER, 0)
+
+    @profiler.profile
+    def draw(self, clear=True):
+        '''
+        draws all added strings, then clears them (unless clear is False)
+        '''
+        if not self.texts: return
+        atlas = self.get_atlas()
+        texts = self.texts
+        fallback = [t for t in texts if not atlas.can_render(t[0])]
+        if fallback:
+            self.texts = [t for t in texts if atlas.can_render(t[0])]
+        pos, uv, rgba = self.build(atlas) if self.texts else ([], None, None)
+        self.texts = [] if clear else texts
+        if fallback: self.draw_fallback(atlas, fallback)
+        count = len(pos)
+        if count == 0: return
+
+        self._upload(self.vbo_pos, pos)
+        self._upload(self.vbo_uv, uv)
+        self._upload(self.vbo_color, rgba)
+
+        bgl.glEnable(bgl.GL_BLEND)
+        bgl.glBlendFunc(bgl.GL_SRC_ALPHA, bgl.GL_ONE_MINUS_SRC_ALPHA)
+        bgl.glActiveTexture(bgl.GL_TEXTURE0)
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, atlas.texture)
+
+        textShader.enable()
+        try:
+            textShader.assign('uPixelMatrix', self.drawing.get_pixel_matrix_buffer())
+            textShader.assign('uAtlas', 0)     # texture unit of atlas (see glActiveTexture above)
+            textShader.vertexAttribPointer(self.vbo_pos, 'vPos', 2, bgl.GL_FLOAT)
+            textShader.vertexAttribPointer(self.vbo_uv, 'vUV', 2, bgl.GL_FLOAT)
+            textShader.vertexAttribPointer(self.vbo_color, 'vColor', 4, bgl.GL_FLOAT)
+            bgl.glDrawArrays(bgl.GL_TRIANGLES, 0, count)
+            textShader.disableVertexAttribArray('vPos')
+            textShader.disableVertexAttribArray('vUV')
+            textShader.disableVertexAttribArray('vColor')
+        finally:
+            textShader.disable()
+            bgl.glBindTexture(bgl.GL_TEXTURE_2D, 0)
@@ -32,6 +32,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 import bpy
 import bgl
+import gpu
 from bpy.types import BoolProperty
 from mathutils import Matrix
 
@@ -90,6 +91,7 @@ class UI_Element:
         self.is_dirty = True
         self.dirty_callbacks = []
         self.defer_recalc = False
+        self._layout = None         # cached layout from last draw, cleared when dirty
 
         self.drawing = Drawing.get_instance()
         self.context = bpy.context
@@ -236,6 +238,7 @@ class UI_Element:
         # print('Marking %s as dirty' % type(self))
         # if type(self) is UI_Label: print('  %s' % self.text)
         self.is_dirty = True
+        self._layout = None
         for ui_item in self.dirty_callbacks:
             ui_item.dirty()
 
@@ -270,15 +273,28 @@ class UI_Element:
             self.last_dpi = self.drawing.get_dpi_mult()
             self.dirty()
 
-        ml = self.drawing.scale(self._margin_left)
-        mr = self.drawing.scale(self._margin_right)
-        mt = self.drawing.scale(self._margin_top)
-        mb = self.drawing.scale(self._margin_bottom)
-
-        self.pos = Point2D((left + ml, top - mt))
-        self.size = Vec2D((width - ml - mr, height - mt - mb))
-        self.pos0 = Point2D((left, top))
-        self.size0 = Vec2D((width, height))
+        # reuse layout from previous draw if not dirty and placed in same spot
+        key = (left, top, width, height)
+        layout = self._layout
+        if not layout or layout['key'] != key:
+            ml = self.drawing.scale(self._margin_left)
+            mr = self.drawing.scale(self._margin_right)
+            mt = self.drawing.scale(self._margin_top)
+            mb = self.drawing.scale(self._margin_bottom)
+            layout = self._layout = {
+                'key': key,
+                'margins': (ml, mr, mt, mb),
+                'pos': Point2D((left + ml, top - mt)),
+                'size': Vec2D((width - ml - mr, height - mt - mb)),
+                'pos0': Point2D((left, top)),
+                'size0': Vec2D((width, height)),
+            }
+        ml,mr,mt,mb = layout['margins']
+
+        self.pos = layout['pos']
+        self.size = layout['size']
+        self.pos0 = layout['pos0']
+        self.size0 = layout['size0']
         self.clip = ScissorStack.get_current_view()
 
         if debug_draw:
@@ -771,6 +787,7 @@ class UI_Container(UI_Element):
         for ui_item in self.ui_items:
             ui_item.unregister_dirty_callback(self)
         self.ui_items = []
+        self.dirty()
 
     def _find_rel_pos_size(self, ui_item):
         oy = 0
@@ -840,37 +857,53 @@ class UI_Container(UI_Element):
                 bgl.glVertex2f(l, t-h)
             bgl.glEnd()
 
+        pr = profiler.start('vertical' if self.vertical else 'horizontal')
+        children = self.get_children_layout()
+        last = len(children) - 1
+        for i,(ui,rect) in enumerate(children):
+            if debug_draw and self.vertical and 0 < i < last:
+                y = rect[1]
+                bgl.glEnable(bgl.GL_BLEND)
+                bgl.glBegin(bgl.GL_QUADS)
+                bgl.glColor4f(1,1,1,0.5)
+                bgl.glVertex2f(l,y+sep)
+                bgl.glVertex2f(l,y)
+                bgl.glVertex2f(l+w,y)
+                bgl.glVertex2f(l+w,y+sep)
+                bgl.glEnd()
+            ui.draw(*rect)
+        pr.done()
+
+    def get_children_layout(self):
+        '''
+        returns list of (ui_item, (left, top, width, height)) for drawing children.
+        cached with layout until container (or any child) is dirtied or moved
+        '''
+        if self._layout and 'children' in self._layout: return self._layout['children']
+        l,t = self.pos
+        w,h = self.size
+        sep = self.drawing.scale(self.separation)
+        children = []
         if self.vertical:
-            pr = profiler.start('vertical')
             y = t
             ui_items = [ui for ui in self.ui_items if ui.get_height() > 0]
             last = len(ui_items) - 1
             for i,ui in enumerate(ui_items):
                 eh = ui.get_height() if i < last else h
-                if debug_draw and 0 < i < last:
-                    bgl.glEnable(bgl.GL_BLEND)
-                    bgl.glBegin(bgl.GL_QUADS)
-                    bgl.glColor4f(1,1,1,0.5)
-                    bgl.glVertex2f(l,y+sep)
-                    bgl.glVertex2f(l,y)
-                    bgl.glVertex2f(l+w,y)
-                    bgl.glVertex2f(l+w,y+sep)
-                    bgl.glEnd()
-                ui.draw(l,y,w,eh)
+                children.append((ui, (l,y,w,eh)))
                 y -= eh + sep
                 h -= eh + sep
-            pr.done()
         else:
-            pr = profiler.start('horizontal')
             x = l
             ui_items = [ui for ui in self.ui_items if ui.get_width() > 0]
             last = len(ui_items) - 1
             for i,ui in enumerate(ui_items):
                 ew = ui.get_width() if i < last else w
-                ui.draw(x,t,ew,h)
+                children.append((ui, (x,t,ew,h)))
                 x += ew + sep
                 w -= ew + sep
-            pr.done()
+        if self._layout: self._layout['children'] = children
+        return children
 
     def get_ui_items(self):
         return list(self.ui_items)
@@ -883,22 +916,30 @@ class UI_EqualContainer(UI_Container):
     @profiler.profile
     def _draw(self):
         if len(self.ui_items) == 0: return
+        for ui,rect in self.get_children_layout():
+            ui.draw(*rect)
+
+    def get_children_layout(self):
+        if self._layout and 'children' in self._layout: return self._layout['children']
         l,t = self.pos
         w,h = self.size
+        children = []
         if self.vertical:
             y = t
             ui_items = [ui for ui in self.ui_items if ui.get_height() > 0]
-            eh = math.floor(h / len(ui_items))
+            eh = math.floor(h / len(ui_items)) if ui_items else 0
             for ui in ui_items:
-                ui.draw(l,y,w,eh)
+                children.append((ui, (l,y,w,eh)))
                 y -= eh
         else:
             x = l
             ui_items = [ui for ui in self.ui_items if ui.get_width() > 0]
-            ew = math.floor(w / len(ui_items))
+            ew = math.floor(w / len(ui_items)) if ui_items else 0
             for ui in ui_items:
-                ui.draw(x,t,ew,h)
+                children.append((ui, (x,t,ew,h)))
                 x += ew
+        if self._layout: self._layout['children'] = children
+        return children
 
 
 class UI_Label(UI_Element):
@@ -1023,6 +1064,7 @@ class UI_WrappedLabel(UI_Element):
         self.color = color
         self.shadowcolor = shadowcolor
         self.wrapped_size = Vec2D(max_size)
+        self.wrap_key = None
 
         self.defer_recalc = False
 
@@ -1057,6 +1099,11 @@ class UI_WrappedLabel(UI_Element):
     def predraw(self):
         # TODO: move code below to _recalc_size?
 
+        # only rewrap (and remeasure) when text, font size, or available width changes
+        wrap_key = (self.text, self.fontsize, self.size.x, self.drawing.get_dpi_mult())
+        if wrap_key == self.wrap_key: return
+        self.wrap_key = wrap_key
+
         size_prev = self.drawing.set_font_size(self.fontsize)
         mwidth = self.size.x
         twidth = self.drawing.get_text_width
@@ -1079,6 +1126,7 @@ class UI_WrappedLabel(UI_Element):
             return lines
         lines = self.text.split('\n')
         self.wrapped_lines = [wrapped_line for line in lines for wrapped_line in wrap(line)]
+        self.wrapped_line_heights = [self.drawing.get_line_height(line) for line in self.wrapped_lines]
         w = twidth(self.wrapped_lines) #max(twidth(l) for l in self.wrapped_lines)
         h = self.drawing.get_line_height(self.wrapped_lines)
         self.wrapped_size = Vec2D((w, h))
@@ -1096,8 +1144,6 @@ class UI_WrappedLabel(UI_Element):
 
         l,t = self.pos
         w,h = self.size
-        twidth = self.drawing.get_text_width
-        theight = self.drawing.get_text_height
 
         if self.bgcolor:
             bgl.glEnable(bgl.GL_BLEND)
@@ -1110,12 +1156,11 @@ class UI_WrappedLabel(UI_Element):
             bgl.glEnd()
 
         y = t
-        for line in self.wrapped_lines:
-            lheight = theight(line)
+        for line,lheight in zip(self.wrapped_lines, self.wrapped_line_heights):
             if self.shadowcolor:
                 self.drawing.text_draw2D(line, Point2D((l+2, y-2)), self.shadowcolor)
             self.drawing.text_draw2D(line, Point2D((l, y)), self.color)
-            y -= self.drawing.get_line_height(line) #line_height #lheight
+            y -= lheight
 
         self.drawing.set_font_size(size_prev)
 
@@ -2252,6 +2297,14 @@ class UI_Frame(UI_Container):
 
 
 
+@blender_version_wrapper('<', '2.80')
+def new_offscreen(width, height):
+    return gpu.offscreen.new(width, height)
+@blender_version_wrapper('>=', '2.80')
+def new_offscreen(width, height):
+    return gpu.types.GPUOffScreen(width, height)
+
+
 class UI_Window(UI_Padding):
     screen_margin = 5
 
@@ -2277,6 +2330,10 @@ class UI_Window(UI_Padding):
         self.visible   = options.get('visible', True)
         self.movable   = options.get('movable', True)
         self.bgcolor   = options.get('bgcolor', (0.1,0.1,0.1,0.75))
+        self.cached    = options.get('cached', False)   # render to offscreen, redraw only on change
+
+        self.offscreen = None
+        self.offscreen_key = None
 
         self.fn_event_handler = options.get('event handler', None)
 
@@ -2361,6 +2418,19 @@ class UI_Window(UI_Padding):
         self.pos = Point2D((l,t))
         self.size = Vec2D((w,h))
 
+    def dirty(self):
+        super().dirty()
+        self.offscreen_key = None
+
+    def _delete(self):
+        super()._delete()
+        self.free_offscreen()
+
+    def free_offscreen(self):
+        if self.offscreen: self.offscreen.free()
+        self.offscreen = None
+        self.offscreen_key = None
+
     def draw_postpixel(self):
         if not self.visible: return
 
@@ -2370,6 +2440,86 @@ class UI_Window(UI_Padding):
         self.update_pos()
         pr.done()
 
+        if self.cached and self.draw_cached(): return
+        self.draw_window()
+
+    def draw_cached(self):
+        '''
+        draws window as a textured quad, rerendering window into offscreen texture only if its
+        contents, size, hover, or state changed.  the texture does not depend on where the window
+        is, so dragging the window only moves the quad.
+        returns False if offscreen could not be used, so window must be drawn directly
+        '''
+        l,t = self.pos
+        w,h = self.size
+        l,t,w,h = int(l),int(t),int(math.ceil(w))+1,int(math.ceil(h))+1
+        key = (w, h, self.drawing.get_dpi_mult(), self.state, self.ui_hover, self.hbf.body_scroll.offset)
+
+        try:
+            if not self.offscreen or (self.offscreen.width, self.offscreen.height) != (w, h):
+                self.free_offscreen()
+                self.offscreen = new_offscreen(w, h)
+            if key != self.offscreen_key:
+                pr = profiler.start('UI_Window: rendering offscreen')
+                self.render_offscreen(l, t, w, h)
+                pr.done()
+                self.offscreen_key = key
+        except Exception as e:
+            print('Caught exception while rendering window to offscreen; drawing directly instead')
+            print(e)
+            self.cached = False
+            self.free_offscreen()
+            return False
+
+        # texture holds premultiplied alpha
+        bgl.glEnable(bgl.GL_BLEND)
+        bgl.glBlendFunc(bgl.GL_ONE, bgl.GL_ONE_MINUS_SRC_ALPHA)
+        bgl.glEnable(bgl.GL_TEXTURE_2D)
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, self.offscreen.color_texture)
+        bgl.glColor4f(1,1,1,1)
+        bgl.glBegin(bgl.GL_QUADS)
+        bgl.glTexCoord2f(0,0)
+        bgl.glVertex2f(l,t-h)
+        bgl.glTexCoord2f(1,0)
+        bgl.glVertex2f(l+w,t-h)
+        bgl.glTexCoord2f(1,1)
+        bgl.glVertex2f(l+w,t)
+        bgl.glTexCoord2f(0,1)
+        bgl.glVertex2f(l,t)
+        bgl.glEnd()
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, 0)
+        bgl.glDisable(bgl.GL_TEXTURE_2D)
+        bgl.glBlendFunc(bgl.GL_SRC_ALPHA, bgl.GL_ONE_MINUS_SRC_ALPHA)
+        return True
+
+    def render_offscreen(self, l, t, w, h):
+        self.offscreen.bind()
+        bgl.glPushAttrib(bgl.GL_COLOR_BUFFER_BIT | bgl.GL_VIEWPORT_BIT)
+        bgl.glMatrixMode(bgl.GL_PROJECTION)
+        bgl.glPushMatrix()
+        bgl.glLoadIdentity()
+        bgl.glOrtho(l, l+w, t-h, t, -1, 1)
+        bgl.glMatrixMode(bgl.GL_MODELVIEW)
+        bgl.glPushMatrix()
+        bgl.glLoadIdentity()
+        ScissorStack.start_offscreen(l, t, w, h)
+        try:
+            bgl.glViewport(0, 0, w, h)
+            bgl.glClearColor(0,0,0,0)
+            bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
+            # accumulate alpha properly, so texture can be composited as premultiplied
+            bgl.glBlendFuncSeparate(bgl.GL_SRC_ALPHA, bgl.GL_ONE_MINUS_SRC_ALPHA, bgl.GL_ONE, bgl.GL_ONE_MINUS_SRC_ALPHA)
+            self.draw_window()
+        finally:
+            ScissorStack.end_offscreen()
+            bgl.glMatrixMode(bgl.GL_PROJECTION)
+            bgl.glPopMatrix()
+            bgl.glMatrixMode(bgl.GL_MODELVIEW)
+            bgl.glPopMatrix()
+            bgl.glPopAttrib()
+            self.offscreen.unbind()
+
+    def draw_window(self):
         l,t = self.pos
         w,h = self.size
 
@@ -13,6 +13,7 @@ from mathutils.geometry import intersect_point_line, intersect_line_plane
 from bpy_extras import view3d_utils
 
 from .maths import Point, Normal, XForm, Ray, Vector, Point2D
+from .counters import counters
 
 
 
@@ -32,6 +33,8 @@ class XMesh:
 
     def clean(self):
         if not self._dirty: return
+        counters.incr('XMesh BVH build')
+        counters.gauge('XMesh faces', len(self.bme.faces))
         self.bme.verts.ensure_lookup_table()
         self.bme.edges.ensure_lookup_table()
         self.bme.faces.ensure_lookup_table()
@@ -65,6 +68,7 @@ class XMesh:
     ###################################################################################
 
     def raycast(self, ray:Ray):
+        counters.incr('XMesh raycast')
         ray_local = self.xform.w2l_ray(ray)
         p,n,i,d = self.bvh.ray_cast(ray_local.o, ray_local.d, ray_local.max)
         if p is None: return (None,None,None,None)
@@ -75,12 +79,14 @@ class XMesh:
         return (p_w,n_w,i,d_w)
 
     def raycast_all(self, ray:Ray):
+        counters.incr('XMesh raycast_all')
         l2w_point,l2w_normal = self.xform.l2w_point,self.xform.l2w_normal
         ray_local = self.xform.w2l_ray(ray)
         hits = []
         origin,direction,maxdist = ray_local.o,ray_local.d,ray_local.max
         dist = 0
         while True:
+            counters.incr('XMesh raycast_all cast')
             p,n,i,d = self.bvh.ray_cast(origin, direction, maxdist)
             if not p: break
             p,n = l2w_point(p),l2w_normal(n)
@@ -92,6 +98,7 @@ class XMesh:
         return hits
 
     def raycast_hit(self, ray:Ray):
+        counters.incr('XMesh raycast_hit')
         ray_local = self.xform.w2l_ray(ray)
         p,n,i,d = self.bvh.ray_cast(ray_local.o, ray_local.d, ray_local.max)
         return p is not None
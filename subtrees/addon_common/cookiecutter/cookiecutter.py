@@ -23,6 +23,7 @@ import bpy
 from bpy.types import Operator
 
 from ..common.debug import debugger
+from ..common.decorators import PersistentOptions
 from ..common.useractions import Actions
 
 from .cookiecutter_fsm import CookieCutter_FSM
@@ -115,6 +116,7 @@ class CookieCutter(Operator, CookieCutter_UI, CookieCutter_FSM, CookieCutter_Uti
             except Exception as e:
                 print('Caught exception while trying to end')
                 debugger.print_exception()
+            PersistentOptions.flush_all()
 
             return {'FINISHED'} if self._done=='finish' else {'CANCELLED'}
 
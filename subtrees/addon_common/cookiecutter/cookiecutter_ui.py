@@ -17,17 +17,158 @@ https://github.com/CGCookie/retopoflow
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+import os
 import math
+import time
+from collections import deque
 
 import bpy
 import bgl
 
+from ..common.counters import counters
 from ..common.debug import debugger
 from ..common.drawing import Drawing
+from ..common.maths import Point2D
 from ..common.ui import UI_WindowManager
 
 
+class DrawTimings:
+    '''
+    collects cpu (and optionally gpu) times of each draw callback over the most recent frames.
+    gpu times come from timer queries, read back a frame late to avoid stalling.
+    '''
+    GL_TIME_ELAPSED = 0x88BF
+    GL_QUERY_RESULT = 0x8866
+    GL_QUERY_RESULT_AVAILABLE = 0x8867
+
+    overrun_report_interval = 1.0   # seconds between console messages about budget overruns
+
+    def __init__(self, window=120, budget=None, gpu=False):
+        self.window = window
+        self.budget = budget        # seconds, or dict of callback name to seconds
+        self.gpu = gpu
+        self.cpu_times = {}
+        self.gpu_times = {}
+        self.overruns = {}
+        self.overruns_reported = {} # callback name to (time, overruns) at last console message
+        self.queries = {}           # callback name to [query id buffer, pending]
+
+    def _add(self, times, fnname, t):
+        if fnname not in times: times[fnname] = deque(maxlen=self.window)
+        times[fnname].append(t)
+
+    def _get_budget(self, fnname):
+        if type(self.budget) is dict: return self.budget.get(fnname, None)
+        return self.budget
+
+    def _gpu_begin(self, fnname):
+        if fnname not in self.queries:
+            ids = bgl.Buffer(bgl.GL_INT, 1)
+            bgl.glGenQueries(1, ids)
+            self.queries[fnname] = [ids, False]
+        ids, pending = self.queries[fnname]
+        if pending:
+            # collect result from previous frame if ready, otherwise skip timing this frame
+            result = bgl.Buffer(bgl.GL_INT, 1)
+            bgl.glGetQueryObjectiv(ids[0], self.GL_QUERY_RESULT_AVAILABLE, result)
+            if not result[0]: return False
+            bgl.glGetQueryObjectiv(ids[0], self.GL_QUERY_RESULT, result)
+            self._add(self.gpu_times, fnname, result[0] / 1000000000)
+        bgl.glBeginQuery(self.GL_TIME_ELAPSED, ids[0])
+        self.queries[fnname][1] = True
+        return True
+
+    def run(self, fnname, fn, *args):
+        query = False
+        if self.gpu:
+            try:
+                query = self._gpu_begin(fnname)
+            except Exception as e:
+                print('Caught exception while starting gpu timer query; disabling gpu timing')
+                print(e)
+                self.gpu = False
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            delta = time.perf_counter() - start
+            if query: bgl.glEndQuery(self.GL_TIME_ELAPSED)
+            self._add(self.cpu_times, fnname, delta)
+            budget = self._get_budget(fnname)
+            if budget is not None and delta > budget:
+                self.overruns[fnname] = self.overruns.get(fnname, 0) + 1
+                self._report_overrun(fnname, delta, budget)
+
+    def _report_overrun(self, fnname, delta, budget):
+        # at most one message per callback every overrun_report_interval (overlay shows all)
+        now = time.time()
+        last_time, last_count = self.overruns_reported.get(fnname, (None, 0))
+        if last_time is not None and now - last_time < self.overrun_report_interval: return
+        count = self.overruns[fnname]
+        self.overruns_reported[fnname] = (now, count)
+        print('Draw callback "%s" overran budget: %0.2fms > %0.2fms (%d overruns since last report)' % (
+            fnname, delta * 1000, budget * 1000, count - last_count
+        ))
+
+    def free(self):
+        for ids,_ in self.queries.values():
+            bgl.glDeleteQueries(1, ids)
+        self.queries = {}
+
+    def clear(self):
+        self.cpu_times, self.gpu_times, self.overruns = {}, {}, {}
+        self.overruns_reported = {}
+
+    @staticmethod
+    def _stats(times):
+        if not times: return None
+        times = sorted(times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        return (sum(times) / len(times), p95, times[-1])
+
+    def stats(self):
+        '''
+        returns dict of callback name to dict of (avg, p95, worst) tuples for 'cpu' and 'gpu'
+        (None if not timed) and count of budget 'overruns'
+        '''
+        return {
+            fnname: {
+                'cpu': self._stats(self.cpu_times.get(fnname)),
+                'gpu': self._stats(self.gpu_times.get(fnname)),
+                'overruns': self.overruns.get(fnname, 0),
+            }
+            for fnname in self.cpu_times
+        }
+
+    def strout(self):
+        s = [
+            'Draw Timings (ms over last %d frames):' % self.window,
+            '  --------- cpu ---------   --------- gpu ---------',
+            '     avg,    p95,  worst       avg,    p95,  worst   over - callback',
+        ]
+        fmt = lambda st: '%7.3f,%7.3f,%7.3f' % tuple(v * 1000 for v in st) if st else '      -,      -,      -'
+        for fnname,st in sorted(self.stats().items()):
+            s += ['  %s   %s  %5d - %s' % (fmt(st['cpu']), fmt(st['gpu']), st['overruns'], fnname)]
+        return '\n'.join(s)
+
+    def export(self, filename=None):
+        if not filename:
+            # .. back to addon_common root
+            path = os.path.dirname(os.path.abspath(__file__))
+            filename = os.path.join(path, '..', 'draw_timings.txt')
+        open(filename, 'wt').write(self.strout())
+        return filename
+
+
 class CookieCutter_UI:
+    # per-callback draw timing; see DrawTimings
+    draw_timing = False             # collect timings of each CookieCutter.Draw callback
+    draw_timing_gpu = False         # also time callbacks on gpu with timer queries
+    draw_timing_overlay = False     # draw timings in corner of 3D view
+    draw_timing_window = 120        # number of recent frames to report over
+    draw_timing_budget = None       # seconds (or dict of callback name to seconds); overruns are logged
+    counters_overlay = False        # draw hot path counters (see common.counters) in corner of 3D view
+
     class Draw:
         def __init__(self, mode):
             assert mode in {'pre3d','post3d','post2d'}
@@ -56,8 +197,14 @@ class CookieCutter_UI:
         self._manipulator = self.drawing.space.show_manipulator
         fns = {'pre3d':[], 'post3d':[], 'post2d':[]}
         for m,fn in self.find_fns('drawmode'): fns[m].append(fn)
-        def draw(fns):
-            for fn in fns: fn(self)
+        self._draw_timings = None
+        if self.draw_timing or self.draw_timing_overlay:
+            self._draw_timings = DrawTimings(window=self.draw_timing_window, budget=self.draw_timing_budget, gpu=self.draw_timing_gpu)
+            def draw(fns):
+                for fn in fns: self._draw_timings.run(fn.fnname, fn, self)
+        else:
+            def draw(fns):
+                for fn in fns: fn(self)
         self._draw_pre3d = lambda:draw(fns['pre3d'])
         self._draw_post3d = lambda:draw(fns['post3d'])
         self._draw_post2d = lambda:draw(fns['post2d'])
@@ -82,6 +229,9 @@ class CookieCutter_UI:
                 debugger.print_exception()
                 print(e)
 
+            if self.draw_timing_overlay: self.draw_timings_overlay()
+            if self.counters_overlay: self.draw_counters_overlay()
+
         self._handle_preview = self._space.draw_handler_add(preview, tuple(), 'WINDOW', 'PRE_VIEW')
         self._handle_postview = self._space.draw_handler_add(postview, tuple(), 'WINDOW', 'POST_VIEW')
         self._handle_postpixel = self._space.draw_handler_add(postpixel, tuple(), 'WINDOW', 'POST_PIXEL')
@@ -98,8 +248,39 @@ class CookieCutter_UI:
         self._space.draw_handler_remove(self._handle_preview, 'WINDOW')
         self._space.draw_handler_remove(self._handle_postview, 'WINDOW')
         self._space.draw_handler_remove(self._handle_postpixel, 'WINDOW')
+        if self._draw_timings: self._draw_timings.free()
         self._area.tag_redraw()
 
+    def draw_timings_overlay(self):
+        if not self._draw_timings: return
+        try:
+            h = self.context.region.height
+            self.drawing.textbox_draw2D(self._draw_timings.strout(), Point2D((10, h - 10)), textbox_position=7)
+        except Exception as e:
+            print('Caught exception while trying to draw timings overlay')
+            debugger.print_exception()
+            print(e)
+
+    def draw_counters_overlay(self):
+        try:
+            self.drawing.textbox_draw2D(counters.strout(), Point2D((10, 10)), textbox_position=1)
+        except Exception as e:
+            print('Caught exception while trying to draw counters overlay')
+            debugger.print_exception()
+            print(e)
+
+    def counters_dump(self, filename=None):
+        ''' writes hot path counters to filename (Counters.json in addon_common if None) '''
+        return counters.dump(filename=filename)
+
+    def draw_timings_export(self, filename=None):
+        '''
+        writes draw timings report to filename (draw_timings.txt in addon_common if None).
+        returns filename, or None if draw timing is not enabled
+        '''
+        if not self._draw_timings: return None
+        return self._draw_timings.export(filename=filename)
+
     ####################################################################
     # common Blender UI functions
 
@@ -0,0 +1,14 @@
+'''
+tests import addon_common.common directly (not through the addon, whose __init__ needs bpy).
+
+test modules that need Blender's modules (bpy, bgl, bmesh, mathutils) skip themselves when
+those are missing.  run with tests as the argument (see pytest.ini), and the full set inside
+Blender's python, ex:
+    python -m pytest tests
+    blender -b --python-expr "import pytest; pytest.main(['tests'])"
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'subtrees'))
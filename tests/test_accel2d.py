@@ -0,0 +1,66 @@
+import random
+
+import pytest
+import numpy as np
+
+pytest.importorskip('bpy')
+from mathutils import Vector
+from addon_common.common.maths import Accel2D, Point2D
+
+
+def make_accel2d(count=500, **kwargs):
+    rnd = random.Random(0)
+    cos = [Vector((rnd.uniform(0, 100), rnd.uniform(0, 50), 0)) for _ in range(count)]
+    project = lambda co: Point2D((co.x, co.y))
+    return (Accel2D.simple_verts(cos, project, **kwargs), np.array([(co.x, co.y) for co in cos]))
+
+
+def test_get_verts():
+    accel, v2ds = make_accel2d()
+    for (x, y, within) in [(50, 25, 5), (0, 0, 10), (99, 49, 3), (30, 10, 40)]:
+        found = {(v.co.x, v.co.y) for v in accel.get_verts(Point2D((x, y)), within)}
+        inside = (np.abs(v2ds[:, 0] - x) <= within) & (np.abs(v2ds[:, 1] - y) <= within)
+        assert {tuple(p) for p in v2ds[inside].tolist()} <= found
+
+
+def test_invalidate():
+    accel, _ = make_accel2d(count=50)
+    v2d = Point2D((50, 25))
+    nearest = min(accel.get_verts(v2d, 200), key=lambda v: (Point2D((v.co.x, v.co.y)) - v2d).length)
+    accel.invalidate(verts=[nearest])
+    assert nearest not in accel.get_verts(v2d, 200)
+    assert len(accel.get_verts(v2d, 200)) == 49
+
+
+def test_clean_invalid():
+    accel, _ = make_accel2d(count=50)
+    v2d = Point2D((50, 25))
+    verts = list(accel.get_verts(v2d, 200))
+    for v in verts[:10]: v.is_valid = False
+    accel.clean_invalid()
+    found = accel.get_verts(v2d, 200)
+    assert len(found) == 40
+    assert not any(v in found for v in verts[:10])
+
+
+@pytest.mark.parametrize('adaptive', [False, True])
+def test_nearest_verts(adaptive):
+    accel, v2ds = make_accel2d(adaptive=adaptive)
+    rnd = random.Random(1)
+    for _ in range(50):
+        x, y = rnd.uniform(-10, 110), rnd.uniform(-10, 60)
+        expected = np.sort(np.hypot(v2ds[:, 0] - x, v2ds[:, 1] - y))
+        found = accel.nearest_verts(Point2D((x, y)), 5)
+        assert np.allclose([d for (_, d) in found], expected[:5])
+        found = accel.nearest_verts(Point2D((x, y)), 5, max_dist=4)
+        assert np.allclose([d for (_, d) in found], expected[:5][expected[:5] <= 4])
+
+
+def test_nearest_verts_skips_invalid():
+    accel, _ = make_accel2d(count=50)
+    v2d = Point2D((50, 25))
+    nearest = [v for (v, _) in accel.nearest_verts(v2d, 3)]
+    accel.invalidate(verts=nearest)
+    found = [v for (v, _) in accel.nearest_verts(v2d, 5)]
+    assert len(found) == 5
+    assert not any(v in found for v in nearest)
@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip('bpy')
+import numpy as np
+from mathutils import Vector
+from addon_common.common.bezier import CubicBezier, CubicBezierSpline
+from addon_common.common.maths import Point2D
+from addon_common.common.bezier import compute_chord_ts, fit_cubicbezier_points, fit_cubicbezier_spline
+
+
+def fit_diff(co, l_t, pts):
+    cb = CubicBezier(*pts)
+    return np.array([tuple(cb.eval(t)) for t in l_t]) - co
+
+
+def test_fit_cubicbezier_points():
+    cb = CubicBezier(Vector((0, 0, 0)), Vector((1, 2, 0)), Vector((3, 2, 1)), Vector((4, 0, 0)))
+    co, l_t, _ = compute_chord_ts([cb.eval(t) for t in np.linspace(0, 1, 200)])
+    _, max_err, p0, p1, p2, p3 = fit_cubicbezier_points(co, l_t)
+    assert max_err == pytest.approx(np.max(np.linalg.norm(fit_diff(co, l_t, (p0, p1, p2, p3)), axis=1)))
+    assert max_err < 0.2
+
+
+def test_fit_cubicbezier_spline_max_error():
+    l_co = [Vector((i * 0.1, abs(i % 20 - 10) * 0.1, 0)) for i in range(60)]
+    assert len(fit_cubicbezier_spline(l_co, 1000.0, allow_split=False)) == 1
+    assert len(fit_cubicbezier_spline(l_co, 1000.0)) == 1
+    assert len(fit_cubicbezier_spline(l_co, 1000.0, max_error=0.001)) > 1
+
+
+def line_spline():
+    # two straight segments of length 3 with evenly spaced control points, so t is linear in length
+    return CubicBezierSpline([
+        CubicBezier(*[Vector((s * 3 + i, 0, 0)) for i in range(4)])
+        for s in range(2)
+    ])
+
+
+@pytest.mark.parametrize('fn_dist', [None, lambda p, q: (p - q).length])
+def test_arclength_ts(fn_dist):
+    spline = line_spline()
+    step = 1 / CubicBezier.split_default
+    ts = spline.approximate_ts_at_intervals_uniform([-1, 0.75, 4.5, 100], fn_dist)
+    assert np.allclose(ts, [0, 0.25, 1.5, 2], atol=step)
+    assert spline.cbs[0].approximate_length_uniform(fn_dist) == pytest.approx(3)
+
+
+def test_arclength_table_cache():
+    spline = line_spline()
+    cb = spline.cbs[0]
+    fn_dist = lambda p, q: (p - q).length
+    table = cb.get_arclength_table(fn_dist)
+    assert cb.get_arclength_table(fn_dist) is table
+    assert cb.get_arclength_table() is not table
+    assert spline.get_arclength_table(fn_dist) is spline.get_arclength_table(fn_dist)
+    cb.p3 = Vector((6, 0, 0))        # moving a control point drops cached tables
+    assert cb.get_arclength_table(fn_dist) is not table
+    assert cb.approximate_length_uniform(fn_dist) > 3
+    for _ in range(2 * CubicBezier.arclength_cache_max):
+        cb.get_arclength_table(lambda p, q: (p - q).length)
+    assert len(cb._arclength) == CubicBezier.arclength_cache_max
+
+
+def test_tessellation_ts():
+    spline = line_spline()
+    spline.tessellate_uniform(lambda p, q: (p - q).length)
+    step = 1 / (CubicBezier.split_default - 1)
+    ts = spline.approximate_ts_at_intervals_tessellation([-1, 0.75, 4.5, 100])
+    assert np.allclose(ts, [0, 0.25, 1.5, 2], atol=step)
+    table = spline.get_tessellation_table()
+    assert spline.get_tessellation_table() is table
+    spline.tessellate_uniform(lambda p, q: (p - q).length, split=10)
+    assert spline.get_tessellation_table() is not table
+
+
+def test_bezier_2d():
+    spline = CubicBezierSpline([
+        CubicBezier(Point2D((i, 0)), Point2D((i + 0.3, 1)), Point2D((i + 0.6, 1)), Point2D((i + 1, 0)))
+        for i in range(2)
+    ])
+    assert spline.eval_many([0.5, 1.5, 2.0]).shape == (3, 2)
+    assert spline.eval_derivative_many([0.5]).shape == (1, 2)
+    pts = spline.cbs[0].tessellate_uniform_points(4)
+    assert len(pts) == 4 and all(type(p) is Point2D for p in pts)
+    assert np.allclose([tuple(p) for p in pts], [tuple(spline.cbs[0].eval(i / 3)) for i in range(4)])
@@ -0,0 +1,60 @@
+import numpy as np
+
+from addon_common.common import binning
+
+
+def test_bins_from_cells():
+    owners = np.array([0, 1, 2, 3])
+    cells = np.array([2, 0, 2, 1])
+    offsets, items = binning.bins_from_cells(owners, cells, 4)
+    assert offsets.tolist() == [0, 1, 2, 4, 4]
+    assert items.tolist() == [1, 3, 0, 2]
+
+
+def test_bins_from_cells_empty():
+    offsets, items = binning.bins_from_cells(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 3)
+    assert offsets.tolist() == [0, 0, 0, 0]
+    assert items.tolist() == []
+
+
+def test_cells_in_rects():
+    i0, j0 = np.array([0, 1]), np.array([0, 1])
+    i1, j1 = np.array([1, 1]), np.array([0, 2])
+    owners, cells = binning.cells_in_rects(i0, j0, i1, j1, 3)
+    assert owners.tolist() == [0, 0, 1, 1]
+    assert cells.tolist() == [0, 1, 4, 7]
+
+
+def test_segment_column_runs():
+    x0, y0 = np.array([0.5, 0.5, 1.5]), np.array([0.5, 0.5, 0.2])
+    x1, y1 = np.array([3.5, 2.5, 1.5]), np.array([0.5, 2.5, 3.7])
+    owners, i, j0, j1 = binning.segment_column_runs(x0, y0, x1, y1, 5, 5)
+    runs = list(zip(owners.tolist(), i.tolist(), j0.tolist(), j1.tolist()))
+    assert runs == [
+        (0, 0, 0, 0), (0, 1, 0, 0), (0, 2, 0, 0), (0, 3, 0, 0),     # horizontal
+        (1, 0, 0, 1), (1, 1, 1, 2), (1, 2, 2, 2),                   # diagonal
+        (2, 1, 0, 3),                                               # vertical
+    ]
+
+
+def test_segment_column_runs_cover_segments():
+    rng = np.random.RandomState(0)
+    cols, rows = 13, 7
+    x0, x1 = rng.uniform(0, cols, 50), rng.uniform(0, cols, 50)
+    y0, y1 = rng.uniform(0, rows, 50), rng.uniform(0, rows, 50)
+    owners, i, j0, j1 = binning.segment_column_runs(x0, y0, x1, y1, cols, rows)
+    covered = {(o, ii, j) for (o, ii, a, b) in zip(owners, i, j0, j1) for j in range(a, b + 1)}
+    for s in np.linspace(0, 1, 1001):
+        x, y = x0 + (x1 - x0) * s, y0 + (y1 - y0) * s
+        for o in range(50):
+            assert (o, int(x[o]), int(y[o])) in covered
+    # a long diagonal covers O(k) cells, not its O(k^2) bounding box
+    assert len(covered) < 50 * (cols + rows)
+
+
+def test_polygon_column_runs():
+    # unit square in cells (1..2, 1..2), as four boundary segments of owner 3
+    x0, y0 = np.array([1.5, 2.5, 2.5, 1.5]), np.array([1.5, 1.5, 2.5, 2.5])
+    x1, y1 = np.array([2.5, 2.5, 1.5, 1.5]), np.array([1.5, 2.5, 2.5, 1.5])
+    owners, i, j0, j1 = binning.polygon_column_runs(np.array([3, 3, 3, 3]), x0, y0, x1, y1, 5, 5)
+    assert list(zip(owners.tolist(), i.tolist(), j0.tolist(), j1.tolist())) == [(3, 1, 1, 2), (3, 2, 1, 2)]
@@ -0,0 +1,31 @@
+import pytest
+import numpy as np
+
+pytest.importorskip('bpy')
+from addon_common.common.bmesh_render import cluster_arrays
+
+
+def test_cluster_arrays():
+    # v3 is close enough to v0 to land in the same cluster
+    arrays = {
+        'vert co': np.array([(0, 0, 0), (1, 0, 0), (0, 1, 0), (0.001, 0, 0)], dtype=np.float32),
+        'vert norm': np.array([(0, 0, 1)] * 4, dtype=np.float32),
+        'vert sel': np.array([False, False, False, True]),
+        'edge verts': np.array([(0, 1), (1, 2), (2, 0), (3, 1), (0, 3)], dtype=np.int32),
+        'edge sel': np.array([False, False, False, True, False]),
+        'tri verts': np.array([(0, 1, 2), (3, 1, 2)], dtype=np.int32),
+        'tri sel': np.array([False, True]),
+        'tri smooth': np.array([True, False]),
+    }
+    clustered = cluster_arrays(arrays, 4)
+    co = clustered['vert co']
+    assert len(co) == 3
+    merged = int(np.argmin(co[:, 0] + co[:, 1]))
+    assert np.allclose(co[merged], (0.0005, 0, 0))
+    assert clustered['vert sel'].tolist() == [i == merged for i in range(3)]
+    # duplicate tri (3,1,2) and edge (3,1), and collapsed edge (0,3), are dropped
+    assert len(clustered['tri verts']) == 1
+    assert clustered['tri sel'].tolist() == [False]
+    assert clustered['tri smooth'].tolist() == [True]
+    assert np.allclose(clustered['tri norm'], [(0, 0, 1)], atol=0.001)
+    assert sorted(map(sorted, clustered['edge verts'].tolist())) == [[0, 1], [0, 2], [1, 2]]
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('bpy')
+from addon_common.common.decorators import CallStats, stats_wrapper, stats_registry, set_stats_enabled
+from addon_common.common.decorators import PersistentOptions
+
+
+class Counted:
+    @stats_wrapper
+    def method(self):
+        return 1
+
+@stats_wrapper
+def counted():
+    return 2
+
+
+def test_callstats_percentiles():
+    stats = CallStats('test.py', '', 1, 'fn')
+    assert stats.percentile(50) == 0.0
+    for _ in range(90): stats.add(0.00001)
+    for _ in range(10): stats.add(0.001)
+    p50, p90, p99 = stats.percentile(50), stats.percentile(90), stats.percentile(99)
+    assert 8e-6 <= p50 <= 16e-6
+    assert p50 <= p90 <= 16e-6
+    assert 512e-6 <= p99 <= 0.001
+    assert stats.percentile(100) == 0.001
+    d = stats.to_dict(percentiles=(50, 99))
+    assert d['count'] == 100
+    assert d['p50'] == p50 and d['p99'] == p99
+    assert sum(d['histogram']) == 100
+
+
+def test_stats_runtime_toggle():
+    was_enabled = stats_registry.enabled
+    try:
+        set_stats_enabled(False)
+        total_count = lambda: sum(s.count for s in stats_registry.stats.values())
+        stats_registry.clear()
+        Counted().method()
+        counted()
+        assert total_count() == 0
+
+        set_stats_enabled(True)
+        assert Counted().method() == 1
+        assert counted() == 2
+        assert total_count() == 2
+
+        set_stats_enabled(False)
+        Counted().method()
+        assert total_count() == 2
+    finally:
+        set_stats_enabled(was_enabled)
+        stats_registry.clear()
+
+
+def test_options_writer(tmp_path):
+    filename = str(tmp_path / 'options.json')
+    writer = PersistentOptions.Writer()
+    writer.write(filename, '{"a": 1}', delay=60.0)
+    writer.write(filename, '{"a": 2}', delay=60.0)     # coalesced with pending write
+    writer.flush(filename)
+    assert open(filename).read() == '{"a": 2}'
+    assert [p.name for p in tmp_path.iterdir()] == ['options.json']
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip('bpy')
+from addon_common.common.drawing import Drawing
+
+
+@pytest.fixture
+def drawing():
+    drawing = Drawing.get_instance()
+    drawing.clear_text_size_cache()
+    yield drawing
+    drawing.__dict__.pop('size_cache_max', None)    # back to class default
+    drawing.clear_text_size_cache()
+
+
+def test_text_size_cache_lru(drawing):
+    drawing.size_cache_max = 3
+    for text in ['a', 'bb', 'ccc']:
+        drawing.get_text_size_info(text, 'width')
+    drawing.get_text_size_info('a', 'width')        # 'a' is now most recently used
+    drawing.get_text_size_info('dddd', 'width')     # drops 'bb'
+    assert [key[0] for key in drawing.size_cache] == ['ccc', 'a', 'dddd']
+    stats = drawing.get_text_size_cache_stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (3, 1, 4)
+
+
+def test_text_size_cache_matches_uncached(drawing):
+    width = drawing.get_text_size_info('cached text', 'width')
+    drawing.clear_text_size_cache()
+    assert drawing.get_text_size_info('cached text', 'width') == width
+    assert drawing.get_text_size_info(['ab', 'abcd'], 'width') == drawing.get_text_size_info('abcd', 'width')
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+pytest.importorskip('bpy')
+from mathutils import Vector
+from addon_common.common.maths import Point, space_evenly_on_path
+
+
+def space_evenly_on_path_loop(verts, segments, cyclic=False, shift=0):
+    # loop that space_evenly_on_path used before it worked on arrays
+    if not cyclic: shift = 0
+    cumulative_lengths = [0]
+    for v0, v1 in zip(verts[:-1], verts[1:]):
+        cumulative_lengths.append(cumulative_lengths[-1] + (v1 - v0).length)
+    if cyclic:
+        cumulative_lengths.append(cumulative_lengths[-1] + (verts[0] - verts[-1]).length)
+    arch_len = cumulative_lengths[-1]
+    if cyclic:
+        new_verts = [None] * segments
+    else:
+        new_verts = [None] * (segments + 1)
+        new_verts[0], new_verts[-1] = verts[0], verts[-1]
+    for i in range(segments - 1 + cyclic):
+        desired_length = (i + 1 - cyclic) / segments * arch_len + shift * arch_len / segments
+        if desired_length > arch_len: desired_length -= arch_len
+        elif desired_length < 0: desired_length += arch_len
+        for j in range(len(verts) + 1):
+            if cumulative_lengths[j] > desired_length: break
+        extra = desired_length - cumulative_lengths[j - 1]
+        v1 = verts[0] if j == len(verts) else verts[j]
+        new_verts[i + 1 - cyclic] = verts[j - 1] + extra * (v1 - verts[j - 1]).normalized()
+    return new_verts
+
+
+@pytest.mark.parametrize('cyclic,shift', [(False, 0), (True, 0), (True, 0.3), (True, -0.45)])
+def test_space_evenly_on_path(cyclic, shift):
+    rnd = random.Random(2)
+    verts = [Vector((rnd.uniform(-5, 5), rnd.uniform(-5, 5), rnd.uniform(-5, 5))) for _ in range(20)]
+    for segments in [3, 7, 40]:
+        expected = space_evenly_on_path_loop(verts, segments, cyclic=cyclic, shift=shift)
+        found = space_evenly_on_path(verts, segments, cyclic=cyclic, shift=shift)
+        assert len(found) == len(expected)
+        for a, b in zip(found, expected):
+            assert (a - b).length < 1e-5     # mathutils.Vector stores float32
+
+
+def test_space_evenly_on_path_keeps_type():
+    verts = [Point((i, i * i, 0)) for i in range(5)]
+    found = space_evenly_on_path(verts, 6)
+    assert all(type(v) is Point for v in found)
@@ -0,0 +1,48 @@
+from addon_common.common.profiler import TraceRecorder
+
+
+def test_trace_balanced():
+    events = [
+        ('orphan', 'E', 0.0, 1),    # begin was overwritten in ring
+        ('a', 'B', 1.0, 1),
+        ('b', 'B', 2.0, 1),
+        ('x', 'E', 2.5, 1),         # does not match open call
+        ('b', 'E', 3.0, 1),
+        ('c', 'B', 3.5, 2),
+        ('a', 'B', 4.0, 1),
+    ]
+    assert TraceRecorder._balanced(events) == [
+        ('a', 'B', 1.0, 1),
+        ('b', 'B', 2.0, 1),
+        ('b', 'E', 3.0, 1),
+        ('c', 'B', 3.5, 2),
+        ('a', 'B', 4.0, 1),
+        ('a', 'E', 4.0, 1),
+        ('a', 'E', 4.0, 1),
+        ('c', 'E', 4.0, 2),
+    ]
+    assert TraceRecorder._balanced([]) == []
+
+
+def test_trace_ring():
+    recorder = TraceRecorder(capacity=4)
+    recorder.start()
+    for name in ['a', 'b', 'c']:
+        recorder.begin(name)
+        recorder.end(name)
+    events = recorder.snapshot()
+    assert [(name, phase) for (name, phase, _, _) in events] == [('b', 'B'), ('b', 'E'), ('c', 'B'), ('c', 'E')]
+    times = [t for (_, _, t, _) in events]
+    assert times == sorted(times)
+
+
+def test_trace_formats():
+    events = [('f  g', 'B', 0.001, 7), ('h', 'B', 0.002, 7), ('h', 'E', 0.003, 7), ('f  g', 'E', 0.004, 7)]
+    chrome = TraceRecorder.to_chrome(events)
+    assert [(e['name'], e['ph'], e['tid']) for e in chrome['traceEvents']] == [('f g', 'B', 7), ('h', 'B', 7), ('h', 'E', 7), ('f g', 'E', 7)]
+    assert chrome['traceEvents'][0]['ts'] == 1000
+    speedscope = TraceRecorder.to_speedscope(events)
+    assert speedscope['shared']['frames'] == [{'name': 'f g'}, {'name': 'h'}]
+    profile, = speedscope['profiles']
+    assert [(e['type'], e['frame']) for e in profile['events']] == [('O', 0), ('O', 1), ('C', 1), ('C', 0)]
+    assert (profile['startValue'], profile['endValue']) == (1, 4)